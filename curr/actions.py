@@ -1,6 +1,5 @@
-import random
 from typing import TYPE_CHECKING
-from config import ACTION_OUTCOMES, SECONDARY_OUTCOMES
+from sampling import OUTCOME_SAMPLERS, SECONDARY_SAMPLERS
 
 if TYPE_CHECKING:
     from npc import NPC
@@ -10,22 +9,18 @@ if TYPE_CHECKING:
 # ACTION LOGIC
 # ============================================================
 def perform_action(npc: "NPC", action: str) -> str:
-    """Simulate performing an action with probabilistic outcomes."""
-    base = ACTION_OUTCOMES[action]
-    outcome = random.choices(base["outcomes"], weights=base["probs"], k=1)[0]
+    """Simulate performing an action with probabilistic outcomes (drawn from npc.rng)."""
+    outcome = OUTCOME_SAMPLERS[action].sample(npc.rng)
     npc.adjust_state(outcome)
 
     # Possible secondary effect
-    if outcome in SECONDARY_OUTCOMES:
-        sec = SECONDARY_OUTCOMES[outcome]
-        sub_outcome = random.choices(sec["outcomes"], weights=sec["probs"], k=1)[0]
+    sec = SECONDARY_SAMPLERS.get(outcome)
+    if sec is not None:
+        sub_outcome = sec.sample(npc.rng)
         npc.adjust_state(sub_outcome)
         outcome = f"{outcome} → {sub_outcome}"
 
-    npc.memory.remember(action, outcome)
-    npc.short_term_memory.add(f"{action} → {outcome}")
-    npc.memory.short_term = npc.short_term_memory  # keep CharacterMemory in sync
-    npc.memory.save()
+    npc.memory.remember(action, outcome)  # short-term memory is a view of the same records
 
     return outcome
 
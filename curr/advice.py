@@ -0,0 +1,79 @@
+from typing import TYPE_CHECKING, List, Optional, Union
+from llm_decisions import get_human_input
+
+if TYPE_CHECKING:
+    from npc import NPC
+
+
+# ============================================================
+# ADVICE PROVIDERS
+# ============================================================
+class AdviceProvider:
+    """Source of companion advice for run_simulation. Return None to give no advice.
+
+    Providers that block for a while (e.g. on a player) set `blocking`, so
+    run_simulation can precompute the no-advice decision in the meantime.
+    """
+
+    blocking = False
+
+    def advise(self, npc: "NPC", day: int) -> Optional[str]:
+        return None
+
+
+class NoAdvice(AdviceProvider):
+    """The NPC decides alone every day."""
+
+
+class HumanAdvice(AdviceProvider):
+    """Ask the player at the keyboard (blocks on input())."""
+
+    blocking = True
+
+    def advise(self, npc: "NPC", day: int) -> Optional[str]:
+        return get_human_input()
+
+
+class ScriptedAdvice(AdviceProvider):
+    """Replay a fixed list of advice, one entry per day starting on day 2.
+
+    Accepts a list of strings or a path to a text file with one line per
+    day. Blank entries, and days past the end of the script, give no advice.
+    """
+
+    def __init__(self, script: Union[List[Optional[str]], str]):
+        if isinstance(script, str):
+            with open(script, "r") as f:
+                script = [line.strip() for line in f]
+        self.script = list(script)
+
+    def advise(self, npc: "NPC", day: int) -> Optional[str]:
+        index = day - 2
+        if 0 <= index < len(self.script):
+            return self.script[index] or None
+        return None
+
+
+class RuleBasedAdvice(AdviceProvider):
+    """A companion that follows the DECISION GUIDANCE from choose_action_llm."""
+
+    def advise(self, npc: "NPC", day: int) -> Optional[str]:
+        if npc.health < 40:
+            return "You're badly hurt. Stay out of danger and buy healing supplies at the Marketplace."
+        if npc.money < 20:
+            if npc.mood > 50 and npc.health > 60:
+                return "We need coin. Accept a Quest."
+            return "We need coin. Try your luck at the Marketplace."
+        if npc.mood < 40:
+            return "You look miserable. Get Drunk and enjoy a night at the tavern."
+        if npc.mood > 50 and npc.health > 60:
+            return "You're in good shape. Accept a Quest and make your fortune."
+        return None
+
+
+def advice_from_spec(spec: str) -> AdviceProvider:
+    """Build a provider from a command-line spec: none, human, rules, or a script file path."""
+    providers = {"none": NoAdvice, "human": HumanAdvice, "rules": RuleBasedAdvice}
+    if spec in providers:
+        return providers[spec]()
+    return ScriptedAdvice(spec)
@@ -0,0 +1,396 @@
+"""
+Benchmarks for the simulation harness, with regression checks.
+
+Runs run_simulation, run_population and the memory/action layers against
+the deterministic StubBackend (or, with --live, the configured model) and
+reports throughput, per-phase latency and peak memory as JSON. Each
+scenario runs --repeat times and every metric keeps its best value. With
+--baseline, results are compared to a stored run and regressions beyond
+--threshold are flagged (exit code 1).
+
+    python benchmark.py --out bench.json
+    python benchmark.py --baseline bench_baseline.json
+    python benchmark.py --save-baseline bench_baseline.json
+    python benchmark.py --live --days 10 --runs 1
+"""
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import simulation
+from actions import perform_action
+from config import ACTIONS, LLM_BACKEND
+from llm_backends import StubBackend
+from llm_interface import get_backend, use_backend
+from memory import CharacterMemory
+from npc import NPC
+
+# Metrics where a larger value is better; all others are better smaller.
+HIGHER_IS_BETTER = {"days_per_sec", "npc_days_per_sec", "loop_days_per_sec",
+                    "loop_npc_days_per_sec", "ops_per_sec"}
+
+# The only metrics that fail the run; every other metric is reported when
+# worse than --threshold but never gated. Each of these stayed within 20%
+# over repeated runs of an unchanged tree. Left out: phase latencies (a
+# millisecond or less under the stub, swinging 20-40% run to run), anything
+# that includes memory flushes (each one fsyncs, so it measures the disk),
+# the population loop and memory_summarize (too short to be steady).
+GATED = ("simulation.loop_days_per_sec", "simulation_fused.loop_days_per_sec",
+         "perform_action.ops_per_sec", "*.peak_kb")
+
+
+# ============================================================
+# PHASE TIMING
+# ============================================================
+# Name -> simulation-module function timed as that phase. Only phases the
+# run actually reaches show up in the results.
+PHASES = {
+    "mood": "adjust_mood_llm",
+    "choose": "choose_action_llm",
+    "act": "perform_action",
+    "describe": "describe_day_llm",
+    "reflect": "reflect_llm",
+    "plan": "plan_day_llm",
+    "wrap_up": "wrap_up_day_llm",
+    "persist": "write_checkpoint",
+}
+ASYNC_PHASES = {
+    "mood": "adjust_mood_llm_async",
+    "choose": "choose_action_llm_async",
+    "describe": "describe_day_llm_async",
+    "reflect": "reflect_llm_async",
+    "plan": "plan_day_llm_async",
+    "wrap_up": "wrap_up_day_llm_async",
+}
+
+
+class PhaseTimer:
+    """Records wall time per call for each phase of the simulation loop."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, phase: str, fn: Callable) -> Callable:
+        samples = self.samples[phase]
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        return timed
+
+    def wrap_async(self, phase: str, fn: Callable) -> Callable:
+        samples = self.samples[phase]
+
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        return timed
+
+    @contextlib.contextmanager
+    def installed(self):
+        """Patch the simulation loop's phase functions (and memory flushes) for the duration."""
+        originals = {}
+        for phase, name in PHASES.items():
+            originals[name] = getattr(simulation, name)
+            setattr(simulation, name, self.wrap(phase, originals[name]))
+        for phase, name in ASYNC_PHASES.items():
+            originals[name] = getattr(simulation, name)
+            setattr(simulation, name, self.wrap_async(phase, originals[name]))
+        flush = CharacterMemory.flush
+        CharacterMemory.flush = self.wrap("persist", flush)
+        try:
+            yield self
+        finally:
+            CharacterMemory.flush = flush
+            for name, fn in originals.items():
+                setattr(simulation, name, fn)
+
+    def total(self, phase: str) -> float:
+        return sum(self.samples.get(phase, ()))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            phase: _latency(samples)
+            for phase, samples in sorted(self.samples.items()) if samples
+        }
+
+
+def _latency(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "calls": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1e3,
+        "p50_ms": ordered[len(ordered) // 2] * 1e3,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e3,
+    }
+
+
+@contextlib.contextmanager
+def _sandbox():
+    """Run in a scratch directory (save files land in the cwd) with stdout silenced."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield scratch
+        finally:
+            os.chdir(cwd)
+
+
+def _peak_kb(fn: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+# ============================================================
+# SCENARIOS
+# ============================================================
+def bench_simulation(days: int, runs: int, fused: bool = False) -> Dict[str, Any]:
+    """Headless run_simulation for `runs` seeds; throughput counts days actually played."""
+    timer = PhaseTimer()
+    played = 0
+    with _sandbox():
+        start = time.perf_counter()
+        with timer.installed():
+            for seed in range(runs):
+                npc = simulation.run_simulation(days, seed=seed, headless=True, fused=fused)
+                played += len(npc.decision_log)
+        elapsed = time.perf_counter() - start
+        peak = _peak_kb(lambda: simulation.run_simulation(days, seed=0, headless=True,
+                                                          fused=fused))
+    return {
+        "days": played,
+        "seconds": elapsed,
+        "days_per_sec": played / elapsed,
+        "loop_days_per_sec": played / (elapsed - timer.total("persist")),
+        "peak_kb": peak,
+        "phases": timer.summary(),
+    }
+
+
+def bench_population(npc_count: int, days: int, fused: bool = False) -> Dict[str, Any]:
+    timer = PhaseTimer()
+    with _sandbox():
+        start = time.perf_counter()
+        with timer.installed():
+            npcs = simulation.run_population(npc_count, days, seed=0, fused=fused)
+        elapsed = time.perf_counter() - start
+        peak = _peak_kb(lambda: simulation.run_population(npc_count, days, seed=0, fused=fused))
+    npc_days = sum(len(npc.decision_log) for npc in npcs)
+    return {
+        "npc_days": npc_days,
+        "seconds": elapsed,
+        "npc_days_per_sec": npc_days / elapsed,
+        "loop_npc_days_per_sec": npc_days / (elapsed - timer.total("persist")),
+        "peak_kb": peak,
+        "phases": timer.summary(),
+    }
+
+
+def _ops(n: int, elapsed: float) -> Dict[str, float]:
+    return {"ops": n, "ops_per_sec": n / elapsed, "us_per_op": elapsed / n * 1e6}
+
+
+def bench_perform_action(n: int) -> Dict[str, Any]:
+    """perform_action alone: outcome sampling, effects and memory bookkeeping."""
+    with _sandbox():
+        npc = NPC(seed=0)
+        start = time.perf_counter()
+        for i in range(n):
+            perform_action(npc, ACTIONS[i % len(ACTIONS)])
+            if not npc.alive() or npc.won():
+                npc.health, npc.money = 100.0, 20.0
+        elapsed = time.perf_counter() - start
+        npc.memory.flush()  # before the scratch directory goes away
+        return _ops(n, elapsed)
+
+
+def bench_memory(n: int, event_log: bool, flush_every: int = 5) -> Dict[str, Any]:
+    """remember() plus a flush every `flush_every` events, as the game loop does per day."""
+    with _sandbox() as scratch:
+        memory = CharacterMemory("Bench", os.path.join(scratch, "bench_state.json"),
+                                 event_log=event_log)
+        start = time.perf_counter()
+        for i in range(n):
+            memory.remember(ACTIONS[i % len(ACTIONS)], f"outcome {i}")
+            if i % flush_every == 0:
+                memory.flush()
+        memory.flush()
+        memory.wait_for_compaction()
+        return _ops(n, time.perf_counter() - start)
+
+
+def bench_summarize(n: int) -> Dict[str, Any]:
+    with _sandbox() as scratch:
+        memory = CharacterMemory("Bench", os.path.join(scratch, "bench_state.json"),
+                                 event_log=False)
+        for i in range(10):
+            memory.remember(ACTIONS[i % len(ACTIONS)], f"outcome {i}")
+        memory.flush()
+        start = time.perf_counter()
+        for _ in range(n):
+            memory.summarize()
+        return _ops(n, time.perf_counter() - start)
+
+
+def _best(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge repeated results of one scenario, keeping each metric's best value.
+
+    Noise (other processes, GC, disk) only ever makes a run slower, so the
+    best of several is the most repeatable number to compare.
+    """
+    merged = {}
+    for key, value in results[0].items():
+        values = [result[key] for result in results if key in result]
+        if isinstance(value, dict):
+            merged[key] = _best(values)
+        elif isinstance(value, (int, float)):
+            merged[key] = max(values) if key in HIGHER_IS_BETTER else min(values)
+        else:
+            merged[key] = value
+    return merged
+
+
+def run_benchmarks(days: int = 100, runs: int = 5, npc_count: int = 20,
+                   ops: int = 2000, live: bool = False,
+                   latency: float = 0.0, repeat: int = 5) -> Dict[str, Any]:
+    """Run every scenario `repeat` times and return the results document."""
+    backend = get_backend() if live else StubBackend(latency=latency)
+    benches = {
+        "simulation": lambda: bench_simulation(days, runs),
+        "simulation_fused": lambda: bench_simulation(days, runs, fused=True),
+        "population": lambda: bench_population(npc_count, min(days, 30)),
+        "perform_action": lambda: bench_perform_action(ops),
+        "memory_snapshot": lambda: bench_memory(ops, event_log=False),
+        "memory_event_log": lambda: bench_memory(ops, event_log=True),
+        "memory_summarize": lambda: bench_summarize(ops),
+    }
+    with use_backend(backend):
+        scenarios = {name: _best([bench() for _ in range(max(1, repeat))])
+                     for name, bench in benches.items()}
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "backend": backend.name,
+            "stub_latency": None if live else latency,
+            "days": days,
+            "runs": runs,
+            "npc_count": npc_count,
+            "ops": ops,
+            "repeat": repeat,
+        },
+        "scenarios": scenarios,
+    }
+
+
+# ============================================================
+# BASELINE COMPARISON
+# ============================================================
+def _metrics(results: Dict[str, Any]) -> Dict[str, float]:
+    """Flatten to "scenario.metric" / "scenario.phases.phase.metric" -> value.
+
+    Only one metric of each derived pair is kept (ops_per_sec, not
+    us_per_op; days_per_sec, not seconds), so one slowdown counts once.
+    Phases use the median call, which a GC pause or a slow fsync does not move.
+    """
+    flat = {}
+    for scenario, values in results["scenarios"].items():
+        for key, value in values.items():
+            if key == "phases":
+                for phase, stats in value.items():
+                    flat[f"{scenario}.phases.{phase}.p50_ms"] = stats["p50_ms"]
+            elif key in HIGHER_IS_BETTER or key.endswith(("_ms", "_kb")):
+                flat[f"{scenario}.{key}"] = value
+    return flat
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = 0.2) -> List[Dict[str, Any]]:
+    """Metrics that got worse than the baseline by more than `threshold` (0.2 = 20%).
+
+    Each entry says whether the metric is "gated" (matches GATED); only
+    gated entries are regressions.
+    """
+    current, before = _metrics(results), _metrics(baseline)
+    changes = []
+    for name, old in sorted(before.items()):
+        new = current.get(name)
+        if new is None or old <= 0:
+            continue
+        higher_better = name.rsplit(".", 1)[-1] in HIGHER_IS_BETTER
+        change = (old - new) / old if higher_better else (new - old) / old
+        if change > threshold:
+            gated = any(fnmatch.fnmatchcase(name, pattern) for pattern in GATED)
+            changes.append({"metric": name, "baseline": old, "current": new,
+                            "worse_by": round(change, 3), "gated": gated})
+    return changes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the simulation harness.")
+    parser.add_argument("--days", type=int, default=100, help="days per run_simulation run")
+    parser.add_argument("--runs", type=int, default=5, help="run_simulation runs (seeds)")
+    parser.add_argument("--npcs", type=int, default=20, help="NPCs in the population scenario")
+    parser.add_argument("--ops", type=int, default=2000, help="iterations per micro-benchmark")
+    parser.add_argument("--live", action="store_true",
+                        help=f"use the configured backend ({LLM_BACKEND}) instead of the stub")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds the stub sleeps per call")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="times each scenario runs; the best value of each metric is kept")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--baseline", default=None, help="compare against this results JSON")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown that counts as a regression")
+    parser.add_argument("--save-baseline", default=None, help="write results as the new baseline")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.days, args.runs, args.npcs, args.ops, args.live, args.latency,
+                             args.repeat)
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        changed = [key for key in ("backend", "stub_latency", "days", "runs", "npc_count",
+                                   "ops", "repeat")
+                   if baseline["meta"].get(key) != results["meta"][key]]
+        if changed:
+            print(f"Warning: baseline was run with different {', '.join(changed)}", file=sys.stderr)
+        changes = compare(results, baseline, args.threshold)
+        results["regressions"] = [change for change in changes if change["gated"]]
+        results["ungated_changes"] = [change for change in changes if not change["gated"]]
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                f.write(text)
+    if results.get("regressions"):
+        print(f"\n{len(results['regressions'])} regression(s) vs {args.baseline}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,70 @@
+import copy
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+from npc import NPC
+from memory import atomic_write_json
+
+CHECKPOINT_VERSION = 1
+
+
+# ============================================================
+# CHECKPOINT / RESUME
+# ============================================================
+def checkpoint_document(npc: NPC, day: int) -> Dict[str, Any]:
+    """Everything needed to continue a run after `day`, copied so later days cannot change it."""
+    version, internal, gauss_next = npc.rng.getstate()
+    return copy.deepcopy({
+        "version": CHECKPOINT_VERSION,
+        "day": day,
+        "npc": {
+            "name": npc.name,
+            "traits": npc.traits,
+            "health": npc.health,
+            "money": npc.money,
+            "mood": npc.mood,
+            "last_report": npc.last_report,
+            "trust": npc.trust,
+            "decision_log": npc.decision_log,
+        },
+        "memory": npc.memory.to_dict(),
+        "rng_state": [version, list(internal), gauss_next],
+    })
+
+
+def write_checkpoint(document: Dict[str, Any], path: str):
+    atomic_write_json(path, document, indent=None)
+
+
+def save_checkpoint(npc: NPC, day: int, path: str):
+    """Snapshot everything needed to continue a run after `day`."""
+    write_checkpoint(checkpoint_document(npc, day), path)
+
+
+def load_checkpoint(path: str) -> Optional[Tuple[NPC, int]]:
+    """Rebuild the NPC from a checkpoint. Returns (npc, last_completed_day), or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        data = json.load(f)
+    if data.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version in {path}: {data.get('version')}")
+
+    saved = data["npc"]
+    npc = NPC(
+        name=saved["name"],
+        traits=saved["traits"],
+        health=saved["health"],
+        money=saved["money"],
+        mood=saved["mood"],
+    )
+    npc.last_report = saved["last_report"]
+    npc.trust = saved["trust"]
+    npc.decision_log = saved["decision_log"]
+
+    # The save file may be ahead of the checkpoint; the checkpoint wins.
+    npc.memory.restore(data["memory"])
+
+    version, internal, gauss_next = data["rng_state"]
+    npc.rng.setstate((version, tuple(internal), gauss_next))
+    return npc, data["day"]
@@ -3,6 +3,63 @@
 # CONFIG - EXPANDED STORY VERSION
 # ============================================================
 
+# ============================================================
+# LLM SETTINGS
+# ============================================================
+LLM_CACHE_ENABLED = False          # cache identical prompts across runs
+LLM_CACHE_PATH = "llm_cache.json"
+LLM_CACHE_MAX_ENTRIES = 5000
+LLM_CACHE_MAX_BYTES = 20_000_000
+LLM_CACHE_SAVE_EVERY = 20          # puts between writes to LLM_CACHE_PATH (also saved at exit)
+LLM_CACHE_SKIP = {"choose_action", "plan_day"}  # call sites that always ask the model
+
+LLM_BACKEND = "ollama"             # ollama, http, subprocess or stub (see llm_backends.py)
+LLM_HOST = None                    # None = OLLAMA_HOST env var or localhost
+LLM_MAX_CONCURRENCY = 4            # in-flight requests for the async client
+LLM_KEEP_ALIVE = "30m"             # keep the model (and its prompt cache) loaded
+
+# Output token caps (Ollama num_predict) per call site
+LLM_NUM_PREDICT = {
+    "choose_action": 96,
+    "adjust_mood": 16,
+    "describe_day": 160,
+    "reflect": 256,                # goals + reflection + an occasional summary
+    "plan_day": 112,
+    "wrap_up_day": 416,
+}
+LLM_NUM_CTX = 2048                 # context window for every call; prompts are fitted into it
+LLM_STREAM_JOURNAL = True          # print journal entries as they are generated
+LLM_FUSED_DAY = False              # two calls per day (plan_day + wrap_up_day)
+LLM_SPECULATE = True               # precompute mood + no-advice choice while the player thinks
+
+# Per-call LLM telemetry (see telemetry.py); None = keep aggregates in memory only
+TELEMETRY_TRACE_PATH = None        # JSONL, one line per call
+TELEMETRY_METRICS_PATH = None      # OpenMetrics text, rewritten at the end of each run
+
+# ============================================================
+# MEMORY PERSISTENCE
+# ============================================================
+MEMORY_EVENT_LOG = False           # append-only JSONL log instead of full rewrites
+MEMORY_LOG_COMPACT_BYTES = 64_000  # compact the log into a snapshot past this size
+
+CHECKPOINT_EVERY = 10              # days between run_simulation checkpoints
+
+# Episodic memory: recent (action, outcome)s are kept and searched by similarity
+EPISODIC_DIM = 256                 # hashed n-gram embedding size
+EPISODIC_TOP_K = 3                 # older memories recalled into choose_action prompts
+EPISODIC_MAX_EPISODES = 200        # newest episodes kept (and saved); older ones live on in summaries
+
+# Hierarchical summaries: memories pushed out of the last five are folded
+# into week and season summaries, piggybacking on reflect_llm
+SUMMARY_DAYS_PER_WEEK = 7          # evicted memories per week summary
+SUMMARY_WEEKS_PER_SEASON = 4       # week summaries per season summary
+SUMMARY_MAX_SEASONS = 4            # older seasons merge into one "long ago" summary
+
+# ============================================================
+# SIMULATION PACING
+# ============================================================
+DAY_PACE_SECONDS = 1.0             # pause between interactive days (headless: 0)
+
 # ============================================================
 # WORLD CONTEXT
 # ============================================================
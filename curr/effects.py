@@ -0,0 +1,103 @@
+import re
+from typing import Dict, List, NamedTuple
+from config import ACTION_OUTCOMES, SECONDARY_OUTCOMES
+
+
+# ============================================================
+# COMPILED OUTCOME EFFECTS
+# ============================================================
+class Effect(NamedTuple):
+    """State change encoded in an outcome string such as "(+10 money, -5 mood)"."""
+    mood: float = 0.0
+    health: float = 0.0
+    money: float = 0.0
+    money_multiplier: float = 1.0  # applied before the money delta
+    die: bool = False
+
+
+NO_EFFECT = Effect()
+
+_DELTA = re.compile(r"([+-]\d+(?:\.\d+)?) (mood|health|money)\b")
+_SPEND = re.compile(r"\bspend (\d+(?:\.\d+)?) money\b")
+_LOSE_FRACTION = re.compile(r"\bLose (0?\.\d+) (health|money)\b")
+_DIE = re.compile(r"\bDie\b")
+
+MAX_HEALTH = 100
+
+
+def parse_effect(text: str, strict: bool = False) -> Effect:
+    """Parse the stat changes out of an outcome string.
+
+    With strict=True, any number left over after the known patterns have
+    been consumed raises ValueError, so typos in config cannot silently
+    turn into "no effect".
+    """
+    deltas = {"mood": 0.0, "health": 0.0, "money": 0.0}
+    multiplier = 1.0
+    rest = text
+
+    def consume(pattern, handler):
+        nonlocal rest
+        for match in pattern.finditer(rest):
+            handler(match)
+        rest = pattern.sub(" ", rest)
+
+    def on_lose(match):
+        nonlocal multiplier
+        fraction = float(match.group(1))
+        if match.group(2) == "money":
+            multiplier *= 1 - fraction
+        else:
+            # "Lose 0.2 health" is a fraction of max health
+            deltas["health"] -= fraction * MAX_HEALTH
+
+    def on_spend(match):
+        deltas["money"] -= float(match.group(1))
+
+    def on_delta(match):
+        deltas[match.group(2)] += float(match.group(1))
+
+    consume(_LOSE_FRACTION, on_lose)
+    consume(_SPEND, on_spend)
+    consume(_DELTA, on_delta)
+    die = bool(_DIE.search(rest))
+
+    if strict and re.search(r"\d", rest):
+        raise ValueError(f"Unparseable effect in outcome: {text!r}")
+
+    return Effect(
+        mood=deltas["mood"],
+        health=deltas["health"],
+        money=deltas["money"],
+        money_multiplier=multiplier,
+        die=die,
+    )
+
+
+def compile_effects(*tables: Dict[str, Dict[str, List]]) -> Dict[str, Effect]:
+    """Parse every outcome in the given tables once, rejecting bad entries."""
+    compiled: Dict[str, Effect] = {}
+    errors = []
+    for table in tables:
+        for action, spec in table.items():
+            if len(spec["outcomes"]) != len(spec["probs"]):
+                errors.append(f"{action!r}: outcomes and probs differ in length")
+            for outcome in spec["outcomes"]:
+                try:
+                    compiled[outcome] = parse_effect(outcome, strict=True)
+                except ValueError as e:
+                    errors.append(str(e))
+    if errors:
+        raise ValueError("Invalid outcome tables:\n  " + "\n  ".join(errors))
+    return compiled
+
+
+EFFECTS = compile_effects(ACTION_OUTCOMES, SECONDARY_OUTCOMES)
+
+
+def effect_for(outcome: str) -> Effect:
+    """Compiled effect for an outcome string (parsed on the fly if not in config)."""
+    effect = EFFECTS.get(outcome)
+    if effect is None:
+        effect = parse_effect(outcome)
+    return effect
@@ -0,0 +1,232 @@
+import threading
+import zlib
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from config import EPISODIC_DIM, EPISODIC_MAX_EPISODES, LLM_HOST
+from interned import FREE, TEXTS, decode, encode
+
+
+# ============================================================
+# EMBEDDERS
+# ============================================================
+class HashedNgramEmbedder:
+    """Character n-grams and words hashed into a fixed-size, L2-normalised vector.
+
+    Needs no model and is deterministic, so vectors can be rebuilt from the
+    text whenever a save file is loaded.
+    """
+
+    def __init__(self, dim: int = EPISODIC_DIM, n: int = 3):
+        self.dim = dim
+        self.n = n
+
+    def embed(self, text: str) -> np.ndarray:
+        padded = f" {text.lower()} "
+        grams = [padded[i:i + self.n] for i in range(len(padded) - self.n + 1)]
+        grams += padded.split()
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for gram in grams:
+            h = zlib.crc32(gram.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class OllamaEmbedder:
+    """Embeddings from an Ollama embedding model (e.g. nomic-embed-text)."""
+
+    def __init__(self, model: str = "nomic-embed-text", host: Optional[str] = LLM_HOST):
+        import ollama  # only needed for this embedder
+
+        self.model = model
+        self.client = ollama.Client(host=host)
+        self.dim = None  # known after the first call
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.client.embed(model=self.model, input=text)["embeddings"][0],
+                            dtype=np.float32)
+        self.dim = len(vector)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+# ============================================================
+# SHARED VECTORS
+# ============================================================
+class VectorTable:
+    """One embedding per distinct interned (action, outcome, secondary) key.
+
+    Outcomes come from the finite tables in config.py, so the table stops
+    growing once every outcome has been seen, and every NPC using the same
+    embedder shares it. Rows are appended to a matrix that doubles when full.
+    """
+
+    def __init__(self, embedder, capacity: int = 64):
+        self.embedder = embedder
+        self._capacity = capacity
+        self._rows: Dict[Tuple[int, int, int], int] = {}
+        self._keys: List[Tuple[int, int, int]] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def row(self, key: Tuple[int, int, int], text: str) -> int:
+        """Row for `key`, embedding `text` the first time the key is seen."""
+        row = self._rows.get(key)
+        if row is not None:
+            return row
+        vector = self.embedder.embed(text)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is not None:
+                return row
+            row = len(self._keys)
+            if self._matrix is None:
+                self._matrix = np.zeros((self._capacity, len(vector)), dtype=np.float32)
+            elif row == len(self._matrix):
+                self._matrix = np.concatenate([self._matrix, np.zeros_like(self._matrix)])
+            self._matrix[row] = vector
+            self._keys.append(key)
+            self._rows[key] = row
+        return row
+
+    def key(self, row: int) -> Tuple[int, int, int]:
+        return self._keys[row]
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Similarity of `query` to every row."""
+        count = len(self._keys)
+        if count == 0:
+            return np.zeros(0, dtype=np.float32)
+        return self._matrix[:count] @ query
+
+
+# Shared by every EpisodicStore built without its own embedder.
+SHARED_VECTORS = VectorTable(HashedNgramEmbedder())
+
+
+# ============================================================
+# EPISODIC STORE
+# ============================================================
+class Episode(NamedTuple):
+    index: int
+    action: str
+    outcome: str
+
+    def text(self) -> str:
+        return f"{self.action} → {self.outcome}"
+
+
+class EpisodicStore:
+    """The newest `max_episodes` (action, outcome)s an NPC has lived through, with top-k search.
+
+    Each episode is one int: its row in a VectorTable (SHARED_VECTORS by
+    default), which holds the interned IDs and the embedding. Outcomes
+    outside the tables (reflections) are embedded on their own, into a
+    float16 matrix kept beside the record. Search scores each distinct row
+    once.
+
+    The store may run a quarter over `max_episodes` before the oldest are
+    dropped in one go, so trimming is amortised. Older memories are still
+    covered by the week and season summaries.
+    """
+
+    def __init__(self, embedder=None, max_episodes: int = EPISODIC_MAX_EPISODES):
+        self.max_episodes = max_episodes
+        self.vectors = SHARED_VECTORS if embedder is None else VectorTable(embedder)
+        self.embedder = self.vectors.embedder
+        self._rows = array("i")  # per episode: VectorTable row, or FREE
+        self._free: Dict[int, Tuple[int, str]] = {}  # episode index -> action id, outcome text
+        self._free_index = array("i")  # episode index of each free vector
+        self._free_vectors: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, index: int) -> Episode:
+        row = self._rows[index]
+        if row == FREE:
+            action_id, outcome = self._free[index]
+            return Episode(index, TEXTS[action_id], outcome)
+        action, outcome = decode(*self.vectors.key(row))
+        return Episode(index, action, outcome)
+
+    def add(self, action: str, outcome: str) -> Episode:
+        index = len(self)
+        episode = Episode(index, action, outcome)
+        action_id, outcome_id, secondary_id, free_text = encode(action, outcome)
+        if free_text is not None:
+            self._add_free(index, self.embedder.embed(episode.text()))
+            self._free[index] = (action_id, free_text)
+            self._rows.append(FREE)
+        else:
+            self._rows.append(self.vectors.row((action_id, outcome_id, secondary_id),
+                                               episode.text()))
+        if len(self._rows) > self.max_episodes + self.max_episodes // 4:
+            self._drop_oldest(len(self._rows) - self.max_episodes)
+        return episode
+
+    def _drop_oldest(self, n: int):
+        del self._rows[:n]
+        self._free = {index - n: entry for index, entry in self._free.items() if index >= n}
+        if self._free_index:
+            free = np.frombuffer(self._free_index[:], dtype=np.intc)
+            keep = free >= n
+            kept = int(keep.sum())
+            vectors = np.zeros((max(4, kept), self._free_vectors.shape[1]), dtype=np.float16)
+            vectors[:kept] = self._free_vectors[:len(free)][keep]
+            self._free_vectors = vectors
+            self._free_index = array("i", (free[keep] - n).tolist())
+
+    def _add_free(self, index: int, vector: np.ndarray):
+        row = len(self._free_index)
+        if self._free_vectors is None:
+            self._free_vectors = np.zeros((4, len(vector)), dtype=np.float16)
+        elif row == len(self._free_vectors):
+            self._free_vectors = np.concatenate([self._free_vectors,
+                                                 np.zeros_like(self._free_vectors)])
+        self._free_vectors[row] = vector
+        self._free_index.append(index)
+
+    def extend(self, pairs: Iterable[Tuple[str, str]]):
+        for action, outcome in pairs:
+            self.add(action, outcome)
+
+    def search(self, query: str, k: int = 3, skip_recent: int = 0) -> List[Tuple[Episode, float]]:
+        """The k distinct episodes most similar to `query`, best first, ignoring the newest `skip_recent`.
+
+        An outcome lived through several times is returned once.
+        """
+        count = len(self) - skip_recent
+        if count <= 0 or k <= 0:
+            return []
+        vector = self.embedder.embed(query)
+        rows = np.frombuffer(self._rows[:count], dtype=np.intc)
+        scores = np.full(count, -np.inf, dtype=np.float32)
+        known = rows >= 0
+        scores[known] = self.vectors.scores(vector)[rows[known]]
+        if self._free_index:
+            free_rows = len(self._free_index)
+            free = np.frombuffer(self._free_index[:free_rows], dtype=np.intc)
+            free_scores = self._free_vectors[:free_rows].astype(np.float32) @ vector
+            older = free < count
+            scores[free[older]] = free_scores[older]
+        top, seen = [], set()
+        for i in np.argsort(-scores, kind="stable").tolist():
+            row = self._rows[i]
+            key = row if row != FREE else self._free[i]
+            if key not in seen:
+                seen.add(key)
+                top.append(i)
+                if len(top) == k:
+                    break
+        return [(self[i], float(scores[i])) for i in top]
+
+    def to_list(self) -> List[List[str]]:
+        episodes = (self[i] for i in range(len(self)))
+        return [[episode.action, episode.outcome] for episode in episodes]
@@ -0,0 +1,155 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from config import ACTION_OUTCOMES, ACTIONS, SECONDARY_OUTCOMES
+
+NONE = -1  # no secondary outcome
+FREE = -2  # outcome text is not in the table and is kept beside the record
+
+
+# ============================================================
+# INTERNED TEXT
+# ============================================================
+class TextTable:
+    """Two-way map between strings and small integer IDs."""
+
+    __slots__ = ("_texts", "_ids")
+
+    def __init__(self, texts: Iterable[str] = ()):
+        self._texts: List[str] = []
+        self._ids: Dict[str, int] = {}
+        for text in texts:
+            self.add(text)
+
+    def add(self, text: str) -> int:
+        text_id = self._ids.get(text)
+        if text_id is None:
+            text_id = self._ids[text] = len(self._texts)
+            self._texts.append(text)
+        return text_id
+
+    def get(self, text: str) -> Optional[int]:
+        return self._ids.get(text)
+
+    def __getitem__(self, text_id: int) -> str:
+        return self._texts[text_id]
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+
+def _table_texts() -> Iterator[str]:
+    yield from ACTIONS
+    yield "Reflection"
+    for table in (ACTION_OUTCOMES, SECONDARY_OUTCOMES):
+        for key, entry in table.items():
+            yield key
+            yield from entry["outcomes"]
+
+
+# Every action and outcome in config.py, shared by all NPCs in the process.
+# IDs are not stable across processes, so saves always store text.
+TEXTS = TextTable(_table_texts())
+
+
+def encode(action: str, outcome: str) -> Tuple[int, int, int, Optional[str]]:
+    """(action_id, outcome_id, secondary_id, free_text) for one memory.
+
+    Actions are a small vocabulary and are always interned. An outcome is
+    "outcome" or "outcome → secondary"; if either part is not in TEXTS
+    (a reflection, say) the record holds FREE and the text is returned.
+    """
+    first, _, second = outcome.partition(" → ")
+    outcome_id = TEXTS.get(first)
+    secondary_id = TEXTS.get(second) if second else NONE
+    if outcome_id is None or secondary_id is None:
+        return TEXTS.add(action), FREE, NONE, outcome
+    return TEXTS.add(action), outcome_id, secondary_id, None
+
+
+def decode(action_id: int, outcome_id: int, secondary_id: int,
+           free_text: Optional[str] = None) -> Tuple[str, str]:
+    if outcome_id == FREE:
+        return TEXTS[action_id], free_text
+    if secondary_id == NONE:
+        return TEXTS[action_id], TEXTS[outcome_id]
+    return TEXTS[action_id], f"{TEXTS[outcome_id]} → {TEXTS[secondary_id]}"
+
+
+def pack(action: str, outcome: str) -> Union[int, str]:
+    """One memory as a single int of interned IDs, or as its text if the outcome is not in TEXTS."""
+    action_id, outcome_id, secondary_id, free_text = encode(action, outcome)
+    if free_text is not None:
+        return f"{action} → {outcome}"
+    return (action_id << 40) | (outcome_id << 20) | (secondary_id + 1)
+
+
+def unpack_text(packed: Union[int, str]) -> str:
+    """The "action → outcome" line for a pack() result."""
+    if isinstance(packed, str):
+        return packed
+    action, outcome = decode(packed >> 40, (packed >> 20) & 0xFFFFF, (packed & 0xFFFFF) - 1)
+    return f"{action} → {outcome}"
+
+
+# ============================================================
+# RECORD STORAGE
+# ============================================================
+class MemoryRing:
+    """Fixed-size FIFO of (action, outcome) memories, stored as interned IDs.
+
+    Three ints per slot in one array. Appending to a full ring overwrites
+    the oldest slot in place, so nothing is shifted. Outcomes outside
+    TEXTS are kept in a slot -> text dict that exists only while needed.
+    """
+
+    __slots__ = ("capacity", "_ids", "_free", "_start", "_size")
+
+    def __init__(self, capacity: int = 5):
+        self.capacity = capacity
+        self._ids = array("i", [NONE]) * (3 * capacity)
+        self._free: Optional[Dict[int, str]] = None
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        """(action, outcome) pairs, oldest first."""
+        for i in range(self._size):
+            yield self._get((self._start + i) % self.capacity)
+
+    def append(self, action: str, outcome: str) -> Optional[Tuple[str, str]]:
+        """Add a memory; returns the (action, outcome) it pushed out, if the ring was full."""
+        evicted = None
+        if self._size == self.capacity:
+            slot = self._start
+            evicted = self._get(slot)
+            self._start = (self._start + 1) % self.capacity
+        else:
+            slot = (self._start + self._size) % self.capacity
+            self._size += 1
+
+        action_id, outcome_id, secondary_id, free_text = encode(action, outcome)
+        base = 3 * slot
+        self._ids[base] = action_id
+        self._ids[base + 1] = outcome_id
+        self._ids[base + 2] = secondary_id
+        if free_text is not None:
+            if self._free is None:
+                self._free = {}
+            self._free[slot] = free_text
+        elif self._free is not None:
+            self._free.pop(slot, None)
+            if not self._free:
+                self._free = None
+        return evicted
+
+    def _get(self, slot: int) -> Tuple[str, str]:
+        base = 3 * slot
+        free_text = self._free.get(slot) if self._free else None
+        return decode(self._ids[base], self._ids[base + 1], self._ids[base + 2], free_text)
+
+    def texts(self) -> List[str]:
+        return [f"{action} → {outcome}" for action, outcome in self]
@@ -0,0 +1,335 @@
+import abc
+import asyncio
+import hashlib
+import json
+import random
+import subprocess
+import time
+import urllib.request
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
+
+from config import LLM_HOST
+
+Messages = List[Dict[str, str]]
+Response = Dict[str, Any]  # Ollama /api/chat shape: {"message": {"content": ...}, "done": ..., ...}
+
+DEFAULT_HOST = "http://localhost:11434"
+
+
+# ============================================================
+# BACKEND INTERFACE
+# ============================================================
+class LLMBackend(abc.ABC):
+    """Where llm_interface sends its chats.
+
+    `chat` returns one response, or with stream=True an iterator of chunks,
+    in Ollama's /api/chat shape: each has ["message"]["content"], and the
+    last one has done=True plus whatever metadata the backend knows
+    (prompt_eval_count, eval_count, ...). `chat_async` is the same for
+    asyncio; streams are async iterators. Streams must support close() /
+    aclose() so callers can stop generation early. A subclass that does
+    not implement `chat` cannot be instantiated.
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    def chat(self, model: str, messages: Messages, options: Optional[Dict[str, Any]] = None,
+             format: Optional[Union[str, Dict[str, Any]]] = None,
+             keep_alive: Optional[str] = None, stream: bool = False):
+        """One response, or with stream=True an iterator of chunks."""
+
+    async def chat_async(self, model: str, messages: Messages,
+                         options: Optional[Dict[str, Any]] = None,
+                         format: Optional[Union[str, Dict[str, Any]]] = None,
+                         keep_alive: Optional[str] = None, stream: bool = False):
+        """Default: run the blocking chat in a worker thread."""
+        if not stream:
+            return await asyncio.to_thread(
+                self.chat, model, messages, options, format, keep_alive
+            )
+        chunks = await asyncio.to_thread(
+            self.chat, model, messages, options, format, keep_alive, True
+        )
+        return _AsyncChunks(chunks)
+
+
+class _AsyncChunks:
+    """Async view of a blocking chunk iterator; each chunk is fetched in a worker thread."""
+
+    def __init__(self, chunks: Iterator[Response]):
+        self._chunks = chunks
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Response:
+        chunk = await asyncio.to_thread(next, self._chunks, None)
+        if chunk is None:
+            raise StopAsyncIteration
+        return chunk
+
+    async def aclose(self):
+        close = getattr(self._chunks, "close", None)
+        if close:
+            await asyncio.to_thread(close)
+
+
+# ============================================================
+# OLLAMA PYTHON CLIENT
+# ============================================================
+class OllamaClientBackend(LLMBackend):
+    """The ollama package. One AsyncClient (and connection pool) per event loop."""
+
+    name = "ollama"
+
+    def __init__(self, host: Optional[str] = LLM_HOST):
+        import ollama  # only needed for this backend
+
+        self._ollama = ollama
+        self.host = host
+        self.client = ollama.Client(host=host)
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_client = None
+
+    def async_client(self):
+        """Return the shared AsyncClient for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_loop = loop
+            self._async_client = self._ollama.AsyncClient(host=self.host)
+        return self._async_client
+
+    def chat(self, model, messages, options=None, format=None, keep_alive=None, stream=False):
+        return self.client.chat(model=model, messages=messages, options=options,
+                                format=format, keep_alive=keep_alive, stream=stream)
+
+    async def chat_async(self, model, messages, options=None, format=None,
+                         keep_alive=None, stream=False):
+        return await self.async_client().chat(model=model, messages=messages, options=options,
+                                              format=format, keep_alive=keep_alive,
+                                              stream=stream)
+
+
+# ============================================================
+# RAW HTTP
+# ============================================================
+class HTTPBackend(LLMBackend):
+    """POST /api/chat with urllib; no third-party packages needed."""
+
+    name = "http"
+
+    def __init__(self, host: Optional[str] = LLM_HOST, timeout: float = 120.0):
+        self.url = (host or DEFAULT_HOST).rstrip("/") + "/api/chat"
+        self.timeout = timeout
+
+    def chat(self, model, messages, options=None, format=None, keep_alive=None, stream=False):
+        body = {"model": model, "messages": messages, "stream": stream}
+        if options:
+            body["options"] = options
+        if format:
+            body["format"] = format
+        if keep_alive is not None:
+            body["keep_alive"] = keep_alive
+        request = urllib.request.Request(
+            self.url, data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        reply = urllib.request.urlopen(request, timeout=self.timeout)
+        if not stream:
+            with reply:
+                return json.loads(reply.read())
+        return self._lines(reply)
+
+    @staticmethod
+    def _lines(reply) -> Iterator[Response]:
+        """NDJSON chunks; closing the generator closes the connection."""
+        with reply:
+            for line in reply:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# ============================================================
+# SUBPROCESS (`ollama run`)
+# ============================================================
+class SubprocessBackend(LLMBackend):
+    """Pipe the prompt into `ollama run`.
+
+    The CLI has no chat roles, sampling options or JSON schemas: messages are
+    joined into one prompt, and any `format` becomes `--format json`.
+    No token counts are reported.
+    """
+
+    name = "subprocess"
+
+    def __init__(self, binary: str = "ollama", timeout: float = 300.0):
+        self.binary = binary
+        self.timeout = timeout
+
+    def _command(self, model, format, keep_alive) -> List[str]:
+        command = [self.binary, "run", model, "--nowordwrap"]
+        if format:
+            command += ["--format", "json"]
+        if keep_alive is not None:
+            command += ["--keepalive", str(keep_alive)]
+        return command
+
+    def chat(self, model, messages, options=None, format=None, keep_alive=None, stream=False):
+        prompt = "\n\n".join(m["content"] for m in messages)
+        command = self._command(model, format, keep_alive)
+        if not stream:
+            result = subprocess.run(command, input=prompt, capture_output=True,
+                                    text=True, timeout=self.timeout, check=True)
+            return {"model": model, "message": {"role": "assistant", "content": result.stdout},
+                    "done": True}
+        return self._stream(command, prompt, model)
+
+    @staticmethod
+    def _stream(command, prompt, model) -> Iterator[Response]:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        try:
+            process.stdin.write(prompt)
+            process.stdin.close()
+            for line in process.stdout:
+                yield {"model": model, "message": {"role": "assistant", "content": line},
+                       "done": False}
+            yield {"model": model, "message": {"role": "assistant", "content": ""},
+                   "done": True}
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+
+
+# ============================================================
+# DETERMINISTIC STAND-IN
+# ============================================================
+_STUB_WORDS = [
+    "the", "tavern", "road", "gold", "keeper", "woods", "quest", "market", "ale",
+    "steel", "shadow", "fortune", "journey", "night", "fire", "coin", "wound", "song",
+]
+
+
+class StubBackend(LLMBackend):
+    """Deterministic replies with no model, for benchmarks, profiling and offline runs.
+
+    The same (seed, model, messages, format) always gives the same reply.
+    With a JSON schema `format` the reply is valid JSON matching it (enums
+    are picked from, integer bounds respected); with "json" it is a small
+    JSON object; otherwise it is a short sentence. `latency` seconds are
+    slept per call to mimic a server.
+    """
+
+    name = "stub"
+
+    def __init__(self, seed: int = 0, latency: float = 0.0, chunk_words: int = 4):
+        self.seed = seed
+        self.latency = latency
+        self.chunk_words = chunk_words
+        self.calls = 0
+
+    def reply(self, model: str, messages: Messages,
+              format: Optional[Union[str, Dict[str, Any]]] = None) -> str:
+        digest = hashlib.sha256(
+            json.dumps([self.seed, model, messages, format], sort_keys=True).encode("utf-8")
+        ).digest()
+        rng = random.Random(digest)
+        if isinstance(format, dict):
+            return json.dumps(_from_schema(format, rng))
+        if format:
+            return json.dumps({"response": _sentence(rng)})
+        return f"Today I walked the {_sentence(rng)}."
+
+    def _response(self, model, messages, content, done=True) -> Response:
+        prompt_tokens = sum(len(m["content"].split()) for m in messages)
+        return {
+            "model": model,
+            "message": {"role": "assistant", "content": content},
+            "done": done,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": 0,
+            "eval_count": len(content.split()),
+            "eval_duration": 0,
+            "load_duration": 0,
+            "total_duration": int(self.latency * 1e9),
+        }
+
+    def chat(self, model, messages, options=None, format=None, keep_alive=None, stream=False):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        content = self.reply(model, messages, format)
+        if not stream:
+            return self._response(model, messages, content)
+        return self._chunks(model, messages, content)
+
+    def _chunks(self, model, messages, content) -> Iterator[Response]:
+        words = content.split(" ")
+        for i in range(0, len(words), self.chunk_words):
+            piece = " ".join(words[i:i + self.chunk_words])
+            if i + self.chunk_words < len(words):
+                yield {"model": model, "message": {"role": "assistant", "content": piece + " "},
+                       "done": False}
+            else:
+                final = self._response(model, messages, content)
+                final["message"] = {"role": "assistant", "content": piece}
+                yield final
+
+    async def chat_async(self, model, messages, options=None, format=None,
+                         keep_alive=None, stream=False):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        content = self.reply(model, messages, format)
+        if not stream:
+            return self._response(model, messages, content)
+        return self._async_chunks(self._chunks(model, messages, content))
+
+    @staticmethod
+    async def _async_chunks(chunks: Iterator[Response]) -> AsyncIterator[Response]:
+        for chunk in chunks:
+            yield chunk
+
+
+def _sentence(rng: random.Random, words: int = 6) -> str:
+    return " ".join(rng.choice(_STUB_WORDS) for _ in range(words))
+
+
+def _from_schema(schema: Dict[str, Any], rng: random.Random) -> Any:
+    """Smallest value that satisfies the subset of JSON Schema our prompts use."""
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    kind = schema.get("type")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {key: _from_schema(sub, rng) for key, sub in properties.items()}
+    if kind == "array":
+        count = max(schema.get("minItems", 1), 1)
+        return [_from_schema(schema.get("items", {"type": "string"}), rng) for _ in range(count)]
+    if kind == "integer":
+        return rng.randint(schema.get("minimum", -10), schema.get("maximum", 10))
+    if kind == "number":
+        return round(rng.uniform(schema.get("minimum", 0.0), schema.get("maximum", 1.0)), 3)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return _sentence(rng)
+
+
+# ============================================================
+# REGISTRY
+# ============================================================
+BACKENDS = {
+    "ollama": OllamaClientBackend,
+    "http": HTTPBackend,
+    "subprocess": SubprocessBackend,
+    "stub": StubBackend,
+}
+
+
+def make_backend(name: str, **kwargs) -> LLMBackend:
+    """Build a backend by name: ollama, http, subprocess or stub."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend {name!r}; expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
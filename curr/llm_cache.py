@@ -0,0 +1,145 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from memory import atomic_write_json
+
+# Caches with unsaved puts are written out when the interpreter exits.
+_open_caches: "weakref.WeakSet[ResponseCache]" = weakref.WeakSet()
+
+
+@atexit.register
+def flush_all():
+    for cache in list(_open_caches):
+        cache.flush()
+
+
+# ============================================================
+# LLM RESPONSE CACHE
+# ============================================================
+class ResponseCache:
+    """LRU cache of LLM responses, optionally persisted to a JSON file.
+
+    Entries are keyed on (model, prompt, temperature, options, format). Once the
+    cache holds more than `max_entries` responses, or more than `max_bytes`
+    of text, the least recently used entries are evicted.
+
+    Safe to share between threads. Writes to disk are batched: the file is
+    saved after every `save_every` puts, on flush(), and at exit.
+    """
+
+    def __init__(self, file_path: Optional[str] = None, max_entries: int = 1000,
+                 max_bytes: Optional[int] = None, save_every: int = 20):
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.save_every = max(1, save_every)
+        self.entries: "OrderedDict[str, str]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # keeps snapshots reaching the file in order
+        _open_caches.add(self)
+
+        if file_path and os.path.exists(file_path):
+            try:
+                with open(file_path, "r") as f:
+                    data = json.load(f)
+                for key, value in data.get("entries", []):
+                    self.entries[key] = value
+                    self.size_bytes += _entry_size(key, value)
+                self._evict()
+            except (json.JSONDecodeError, ValueError, TypeError):
+                print(f"[Cache] Ignoring unreadable cache file: {file_path}")
+                self.entries.clear()
+                self.size_bytes = 0
+
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float,
+                 options: Optional[Dict[str, Any]] = None,
+                 fmt: Optional[Any] = None) -> str:
+        """Stable hash of everything that influences the model's reply."""
+        parts = [model, prompt, temperature, options or {}]
+        if fmt:
+            parts.append(fmt)
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            if key in self.entries:
+                self.size_bytes -= _entry_size(key, self.entries[key])
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            self.size_bytes += _entry_size(key, value)
+            self._evict()
+            self._unsaved += 1
+            due = self._unsaved >= self.save_every
+        if due:
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.size_bytes = 0
+            self._unsaved += 1
+        self.save()
+
+    def flush(self):
+        """Save now if any put has not reached the file yet."""
+        if self._unsaved:
+            self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "unsaved": self._unsaved,
+            }
+
+    def save(self):
+        """Write the cache to disk (see memory.atomic_write_json)."""
+        if not self.file_path:
+            return
+        with self._save_lock:
+            with self._lock:
+                data = {"entries": list(self.entries.items())}
+                self._unsaved = 0
+            atomic_write_json(self.file_path, data, indent=None)
+
+    def _evict(self):
+        # Caller holds self._lock.
+        while self.entries and (
+            len(self.entries) > self.max_entries
+            or (self.max_bytes is not None and self.size_bytes > self.max_bytes)
+        ):
+            key, value = self.entries.popitem(last=False)
+            self.size_bytes -= _entry_size(key, value)
+            self.evictions += 1
+
+
+def _entry_size(key: str, value: str) -> int:
+    return len(key) + len(value.encode("utf-8"))
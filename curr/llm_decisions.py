@@ -1,13 +1,122 @@
 import json
-import re
-from typing import TYPE_CHECKING
-from llm_interface import ollama_chat
-from config import WORLD_CONTEXT
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from llm_interface import ollama_chat_stream, ollama_chat_stream_async
+from config import WORLD_CONTEXT, LLM_NUM_CTX, LLM_NUM_PREDICT
+from prompt_budget import Section, assemble, prompt_budget
+from telemetry import get_telemetry
 
 if TYPE_CHECKING:
     from npc import NPC
 
 
+# ============================================================
+# STRUCTURED OUTPUTS
+# ============================================================
+# Each call site asks Ollama for JSON matching a schema and gets back one
+# of these records (or None if the reply could not be used).
+class ActionDecision(NamedTuple):
+    reasoning: str
+    action: str
+
+
+class MoodChange(NamedTuple):
+    delta: int
+
+
+class Reflection(NamedTuple):
+    goals: List[str]
+    reflection: str
+    summary: Optional[str] = None  # condensed older memories, when a fold was pending
+
+
+class DayPlan(NamedTuple):
+    mood_change: Optional[MoodChange]
+    decision: ActionDecision
+
+
+class DayWrapUp(NamedTuple):
+    journal: str
+    reflection: Optional[Reflection]
+
+
+def _action_schema(available_actions: List[str]) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {
+            "reasoning": {"type": "string"},
+            "action": {"type": "string", "enum": available_actions},
+        },
+        "required": ["reasoning", "action"],
+    }
+
+
+MOOD_SCHEMA = {
+    "type": "object",
+    "properties": {"mood_change": {"type": "integer", "minimum": -10, "maximum": 10}},
+    "required": ["mood_change"],
+}
+
+REFLECTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "goals": {"type": "array", "items": {"type": "string"}},
+        "reflection": {"type": "string"},
+    },
+    "required": ["goals", "reflection"],
+}
+
+
+def _reflection_schema(npc: "NPC") -> Dict[str, Any]:
+    """REFLECTION_SCHEMA, plus a summary field while older memories are waiting to be folded."""
+    if npc.memory.summaries.pending() is None:
+        return REFLECTION_SCHEMA
+    return {
+        "type": "object",
+        "properties": {**REFLECTION_SCHEMA["properties"], "summary": {"type": "string"}},
+        "required": [*REFLECTION_SCHEMA["required"], "summary"],
+    }
+
+
+def _plan_day_schema(available_actions: List[str]) -> Dict[str, Any]:
+    schema = _action_schema(available_actions)
+    return {
+        "type": "object",
+        "properties": {**MOOD_SCHEMA["properties"], **schema["properties"]},
+        "required": ["mood_change", *schema["required"]],
+    }
+
+
+def _wrap_up_schema(npc: "NPC", reflect: bool) -> Dict[str, Any]:
+    properties = {"journal": {"type": "string"}}
+    required = ["journal"]
+    if reflect:
+        reflection = _reflection_schema(npc)
+        properties.update(reflection["properties"])
+        required += reflection["required"]
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def _options(call_site: str) -> Dict[str, int]:
+    # One num_ctx for every call: a different value would make Ollama reload the model
+    return {"num_predict": LLM_NUM_PREDICT[call_site], "num_ctx": LLM_NUM_CTX}
+
+
+def _fit_prompt(call_site: str, system: str, sections: List[Section]) -> str:
+    """Assemble `sections` within what num_ctx leaves after `system` and the reply."""
+    assembled = assemble(sections, prompt_budget(system, LLM_NUM_PREDICT[call_site]))
+    get_telemetry().record_prompt(call_site, assembled.tokens, assembled.budget,
+                                  assembled.trimmed)
+    return assembled.text
+
+
+def _load_json(response: str) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(response)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
 # ============================================================
 # LLM DECISIONS
 # ============================================================
@@ -18,16 +127,50 @@ def get_human_input() -> str:
     return advice if advice else None
 
 
-def choose_action_llm(npc: "NPC", human_advice: str = None) -> str:
+# Every call sends a static system message (persona, world, instructions) and
+# a dynamic user message (today's state). Every call site's system message
+# starts with the same _system_prefix, with its own instructions after it, so
+# Ollama's single slot can keep the evaluated persona and WORLD_CONTEXT when
+# the day moves from one call site to the next.
+CHOOSE_ACTION_ANSWER = "Answer in JSON with one sentence of reasoning and your action."
+
+
+def _system_prefix(npc: "NPC") -> str:
+    """Persona and world, byte-identical at the start of every call site's system message."""
+    return f"""You are {npc.name}, a {', '.join(npc.traits)} adventurer in the kingdom of Valdoria.
+
+{WORLD_CONTEXT}
+"""
+
+
+def _choose_action_system(npc: "NPC", answer: str = CHOOSE_ACTION_ANSWER) -> str:
+    return _system_prefix(npc) + f"""
+=== DECISION GUIDANCE ===
+Consider your circumstances carefully:
+- If your companion gave advice AND trust >= 30: Their counsel should guide you
+- If health < 40: Prioritize survival (avoid dangerous quests)
+- If money < 20: You desperately need income
+- If mood < 40: Seek joy or purpose to maintain your spirit
+- Review your recent adventures - what patterns emerge? What worked? What failed?
+
+The kingdom's fate may hinge on your choices. Choose wisely.
+
+{answer}
+"""
+
+
+def _choose_action_prompt(npc: "NPC", human_advice: str = None, answer: Optional[str] = None,
+                         call_site: str = "choose_action") -> Tuple[str, str, List[str]]:
+    """Return (system, prompt, available_actions), the prompt fitted to `call_site`'s budget."""
     available_actions = ["Chat with Keeper", "Get Drunk"]
-    
+
     # Quest availability
     if npc.mood > 50 and npc.health > 60:
         available_actions.append("Accept a Quest")
-    
+
     # Marketplace and Woods always available
     available_actions.extend(["Visit the Marketplace", "Explore the Woods"])
-    
+
     action_list = ", ".join(available_actions)
 
     previous_context = (
@@ -54,16 +197,19 @@ def choose_action_llm(npc: "NPC", human_advice: str = None) -> str:
             "You deeply trust this person. Their advice should heavily influence your decision."
         )
 
-        advice_section = f"""
-=== ADVICE FROM YOUR COMPANION ===
+        advice_section = f"""\
 "{human_advice}"
 Trust Level: {npc.trust:.1f}/100 — {trust_tier}
 
 If trust >= 30: Their advice should be your PRIMARY consideration.
 """
 
-    # Get history
+    # Get history: the last few days, plus the older memories most like today
     history = npc.memory.summarize()
+    recalled = npc.memory.recall(
+        f"{npc.last_report} {human_advice or ''} "
+        f"{health_status} health, {money_status} money, {mood_status} mood"
+    )
 
     # Helper to safely format goals that may be a list of strings or dicts
     def _format_goals(goals) -> str:
@@ -85,130 +231,386 @@ If trust >= 30: Their advice should be your PRIMARY consideration.
             return str(goals)
 
     # ---------- ENHANCED STORY PROMPT ----------
-    prompt = f"""You are {npc.name}, a {', '.join(npc.traits)} adventurer in the kingdom of Valdoria.
-
-{WORLD_CONTEXT}
-
-=== YOUR CURRENT SITUATION (Day {len(npc.decision_log) + 1}) ===
+    # Cut first when over budget: similar past experiences, then older
+    # summaries, yesterday, goals, recent adventures and advice. State and
+    # the action list are always kept.
+    situation = f"""=== YOUR CURRENT SITUATION (Day {len(npc.decision_log) + 1}) ===
 Health: {npc.health:.1f} / 100 ({health_status})
 Money: {npc.money:.1f} gold ({money_status})
-Mood: {npc.mood:.1f} / 100 ({mood_status})
+Mood: {npc.mood:.1f} / 100 ({mood_status})"""
+    sections = [
+        Section("situation", situation),
+        Section("yesterday", previous_context, 40, "start"),
+        Section("earlier", npc.memory.summarize_older(), 20, "end", "=== EARLIER TIMES ==="),
+        Section("recent", history, 60, "end", "=== YOUR RECENT ADVENTURES ==="),
+        Section("recalled", recalled, 10, "start", "=== SIMILAR PAST EXPERIENCES ==="),
+        Section("goals", f"Your Goals: {_format_goals(npc.memory.goals)}", 50, "start"),
+        Section("advice", advice_section.strip(), 90, "start",
+                "=== ADVICE FROM YOUR COMPANION ==="),
+        Section("actions", action_list, title="=== AVAILABLE ACTIONS ==="),
+    ]
+    system = _choose_action_system(npc, answer or CHOOSE_ACTION_ANSWER)
+    return system, _fit_prompt(call_site, system, sections), available_actions
+
+
+def show_reasoning(npc: "NPC", decision: ActionDecision) -> None:
+    if decision.reasoning:
+        print(f"\n{npc.name}'s reasoning: {decision.reasoning}")
+
+
+def _parse_action(npc: "NPC", response: str, available_actions: List[str],
+                  echo: bool = True) -> ActionDecision:
+    data = _load_json(response) or {}
+    reasoning = str(data.get("reasoning", "")).strip()
+    action = data.get("action")
+    if action not in available_actions:
+        action = "Get Drunk"
+
+    decision = ActionDecision(reasoning, action)
+    if echo:
+        show_reasoning(npc, decision)
+    return decision
+
+
+def decide_action_llm(npc: "NPC", human_advice: str = None, echo: bool = True,
+                      stop_when: Optional[Callable[[str], bool]] = None,
+                      call_site: str = "choose_action") -> ActionDecision:
+    """Structured choice: reasoning plus one of the available actions.
+
+    With echo=False the reasoning is not printed (see show_reasoning).
+    `stop_when` abandons the reply mid-stream (see ollama_chat_stream);
+    such calls skip the cache so a cut-off reply is never stored.
+    `call_site` tags the call in telemetry.
+    """
+    system, prompt, available_actions = _choose_action_prompt(npc, human_advice)
+    response = ollama_chat_stream(
+        prompt, temperature=0.7,
+        options=_options("choose_action"),
+        use_cache=stop_when is None, stop_when=stop_when,
+        format=_action_schema(available_actions),
+        system=system, call_site=call_site,
+    )
+    return _parse_action(npc, response, available_actions, echo)
 
-{previous_context}
 
-=== YOUR RECENT ADVENTURES ===
-{history}
+async def decide_action_llm_async(npc: "NPC", human_advice: str = None) -> ActionDecision:
+    system, prompt, available_actions = _choose_action_prompt(npc, human_advice)
+    response = await ollama_chat_stream_async(
+        prompt, temperature=0.7,
+        options=_options("choose_action"),
+        format=_action_schema(available_actions),
+        system=system, call_site="choose_action",
+    )
+    return _parse_action(npc, response, available_actions)
 
-Your Goals: {_format_goals(npc.memory.goals)}
 
-{advice_section}
+def choose_action_llm(npc: "NPC", human_advice: str = None) -> str:
+    return decide_action_llm(npc, human_advice).action
 
-=== AVAILABLE ACTIONS ===
-{action_list}
 
-=== DECISION GUIDANCE ===
-Consider your circumstances carefully:
-- If your companion gave advice AND trust >= 30: Their counsel should guide you
-- If health < 40: Prioritize survival (avoid dangerous quests)
-- If money < 20: You desperately need income
-- If mood < 40: Seek joy or purpose to maintain your spirit
-- Review your recent adventures - what patterns emerge? What worked? What failed?
+async def choose_action_llm_async(npc: "NPC", human_advice: str = None) -> str:
+    return (await decide_action_llm_async(npc, human_advice)).action
 
-The kingdom's fate may hinge on your choices. Choose wisely.
 
-Respond in this format:
-REASONING: [One sentence reflecting on your situation]
-ACTION: {available_actions[0]}
-"""
+def _describe_day_system(npc: "NPC") -> str:
+    return _system_prefix(npc) + f"""
+=== JOURNAL ===
+Write a brief (2-3 sentence) journal entry for {npc.name}.
 
-    response = ollama_chat(prompt, temperature=0.7)
-
-    # Extract reasoning
-    if "REASONING:" in response:
-        reasoning = response.split("REASONING:")[1].split("ACTION:")[0].strip()
-        print(f"\n{npc.name}'s reasoning: {reasoning}")
+STYLE GUIDELINES:
+- Write in first person as {npc.name}
+- Maintain medieval/fantasy tone
+- Reference the actual outcome (don't invent stats)
+- Show emotional state through word choice
+- Connect to previous entry if relevant
 
-    # Parse action
-    for act in available_actions:
-        if act in response:
-            return act
+Write ONLY the journal entry. Do not include notes, explanations, or meta-commentary.
 
-    return "Get Drunk"
+Example format: "Today I [action]. [Outcome and reaction]. [Brief reflection on state/feelings]."
+"""
 
 
-def describe_day_llm(npc: "NPC", action: str, event: str) -> str:
-    """Generate consistent journal entries."""
-    
+def _describe_day_sections(npc: "NPC", action: str, event: str) -> List[Section]:
     day_number = len(npc.decision_log) + 1
-    
-    prompt = f"""Write a brief (2-3 sentence) journal entry for {npc.name}.
 
-CONTEXT:
+    context = f"""CONTEXT:
 - Day {day_number} in the Year of the Golden Anvil
 - Action taken: {action}
 - What happened: {event}
-- Current state: {npc.health:.0f} health, {npc.money:.0f} gold, feeling {"optimistic" if npc.mood > 60 else "troubled" if npc.mood < 40 else "steady"}
+- Current state: {npc.health:.0f} health, {npc.money:.0f} gold, feeling {"optimistic" if npc.mood > 60 else "troubled" if npc.mood < 40 else "steady"}"""
+    return [
+        Section("context", context),
+        Section("previous_entry", f"PREVIOUS ENTRY: {npc.last_report}", 40, "start"),
+    ]
 
-PREVIOUS ENTRY: {npc.last_report}
 
-STYLE GUIDELINES:
-- Write in first person as {npc.name}
-- Maintain medieval/fantasy tone
-- Reference the actual outcome (don't invent stats)
-- Show emotional state through word choice
-- Connect to previous entry if relevant
+def _describe_day_prompt(npc: "NPC", action: str, event: str) -> str:
+    return _fit_prompt("describe_day", _describe_day_system(npc),
+                       _describe_day_sections(npc, action, event))
 
-Write ONLY the journal entry. Do not include notes, explanations, or meta-commentary.
 
-Example format: "Today I [action]. [Outcome and reaction]. [Brief reflection on state/feelings]."
-"""
-    
-    report = ollama_chat(prompt, temperature=0.6)
-    
+def _apply_report(npc: "NPC", report: str) -> str:
     # Strip out any meta-commentary in parentheses or after "Note:"
     if "(Note:" in report:
         report = report.split("(Note:")[0].strip()
     if "(I tried" in report:
         report = report.split("(I tried")[0].strip()
-    
+
     npc.last_report = report
     return report
 
 
-def adjust_mood_llm(npc: "NPC") -> None:
-    """Ask LLM how mood should change based on previous day."""
-    prompt = f"""
+def describe_day_llm(npc: "NPC", action: str, event: str,
+                     on_token: Optional[Callable[[str], None]] = None) -> str:
+    """Generate consistent journal entries. `on_token` receives the text as it streams."""
+    report = ollama_chat_stream(
+        _describe_day_prompt(npc, action, event), temperature=0.6,
+        options=_options("describe_day"),
+        on_token=on_token,
+        system=_describe_day_system(npc), call_site="describe_day",
+    )
+    return _apply_report(npc, report)
+
+
+async def describe_day_llm_async(npc: "NPC", action: str, event: str) -> str:
+    report = await ollama_chat_stream_async(
+        _describe_day_prompt(npc, action, event), temperature=0.6,
+        options=_options("describe_day"),
+        system=_describe_day_system(npc), call_site="describe_day",
+    )
+    return _apply_report(npc, report)
+
+
+def _adjust_mood_system(npc: "NPC") -> str:
+    return _system_prefix(npc) + """
+=== MOOD ===
+Given your current state and yesterday's report, decide how your mood should
+adjust (-10 to +10). Answer in JSON.
+"""
+
+
+def _adjust_mood_prompt(npc: "NPC") -> str:
+    return f"""
 NPC current state: {npc.state()}.
 Yesterday's report: {npc.last_report}.
-Based on the events, how should mood adjust (-10 to +10)? Respond with a single integer.
 """
-    response = ollama_chat(prompt)
+
+
+def _parse_mood(response: str) -> Optional[MoodChange]:
+    data = _load_json(response)
     try:
-        mood_change = int(re.findall(r"-?\d+", response)[0])
-        npc.mood = max(0, min(100, npc.mood + mood_change))
-    except (ValueError, IndexError):
-        pass
+        return MoodChange(max(-10, min(10, int(data["mood_change"]))))
+    except (TypeError, KeyError, ValueError):
+        return None
 
 
-def reflect_llm(npc: "NPC"):
-    """Every few days, let the NPC update goals or reflect."""
-    prompt = f"""
-You are {npc.name}, reflecting on your recent adventures and memories:
-{npc.memory.summarize()}.
-Current goals: {npc.memory.goals}.
+def _apply_mood(npc: "NPC", change: Optional[MoodChange]) -> None:
+    if change is not None:
+        npc.mood = max(0, min(100, npc.mood + change.delta))
+
+
+def mood_change_llm(npc: "NPC") -> Optional[MoodChange]:
+    """Structured mood delta for the previous day, or None if the reply was unusable."""
+    return _parse_mood(ollama_chat_stream(
+        _adjust_mood_prompt(npc),
+        options=_options("adjust_mood"),
+        format=MOOD_SCHEMA,
+        system=_adjust_mood_system(npc), call_site="adjust_mood",
+    ))
+
+
+async def mood_change_llm_async(npc: "NPC") -> Optional[MoodChange]:
+    return _parse_mood(await ollama_chat_stream_async(
+        _adjust_mood_prompt(npc),
+        options=_options("adjust_mood"),
+        format=MOOD_SCHEMA,
+        system=_adjust_mood_system(npc), call_site="adjust_mood",
+    ))
+
+
+def adjust_mood_llm(npc: "NPC") -> None:
+    """Ask LLM how mood should change based on previous day."""
+    _apply_mood(npc, mood_change_llm(npc))
+
+
+async def adjust_mood_llm_async(npc: "NPC") -> None:
+    _apply_mood(npc, await mood_change_llm_async(npc))
+
+
+def _reflect_system(npc: "NPC") -> str:
+    return _system_prefix(npc) + """
+=== REFLECTION ===
+Reflect on your recent adventures and memories.
 Based on your experiences, suggest any goal or mindset adjustments (if any).
-Respond as JSON: {{ "goals": [...], "reflection": "<short text>" }}
+Answer in JSON with your updated goals and a short reflection.
 """
-    resp = ollama_chat(prompt)
-    match = re.search(r"\{.*\}", resp, re.DOTALL)
-    if match:
-        try:
-            data = json.loads(match.group())
-            npc.memory.goals = data.get("goals", npc.memory.goals)
-            reflection_text = data.get('reflection', 'I pondered my journey')
-            npc.memory.remember("Reflection", reflection_text)
-            
-            npc.memory.save()
-        except (json.JSONDecodeError, KeyError, ValueError):
-            pass
 
+
+def _reflect_sections(npc: "NPC") -> List[Section]:
+    sections = [
+        Section("earlier", npc.memory.summarize_older(), 20, "end", "Earlier times:"),
+        Section("recent", npc.memory.summarize(), 60, "end", "Recent adventures and memories:"),
+        Section("goals", f"Current goals: {npc.memory.goals}.", 50, "start"),
+    ]
+    pending = npc.memory.summaries.pending()
+    if pending:
+        # Piggyback one fold on this call: only the newest full window is summarized
+        sections.append(Section(
+            "fold", "\n".join(f"  • {text}" for text in pending.texts),
+            title="Also condense these older memories into one or two sentences "
+                  "for the summary field:",
+        ))
+    return sections
+
+
+def _reflect_prompt(npc: "NPC") -> str:
+    return _fit_prompt("reflect", _reflect_system(npc), _reflect_sections(npc))
+
+
+def _parse_reflection(resp: str) -> Optional[Reflection]:
+    data = _load_json(resp)
+    if not data or not isinstance(data.get("goals"), list):
+        return None
+    return Reflection(
+        [str(g) for g in data["goals"]],
+        str(data.get("reflection") or "I pondered my journey"),
+        str(data.get("summary") or "").strip() or None,
+    )
+
+
+def _apply_reflection(npc: "NPC", reflection: Optional[Reflection]):
+    if reflection is None:
+        return
+    npc.memory.goals = reflection.goals
+    npc.memory.mark_dirty()
+    if reflection.summary:
+        npc.memory.fold(reflection.summary)  # before remember() can push out another memory
+    npc.memory.remember("Reflection", reflection.reflection)
+
+
+def reflection_llm(npc: "NPC") -> Optional[Reflection]:
+    """Structured reflection (new goals + text), or None if the reply was unusable."""
+    return _parse_reflection(ollama_chat_stream(
+        _reflect_prompt(npc),
+        options=_options("reflect"),
+        format=_reflection_schema(npc),
+        system=_reflect_system(npc), call_site="reflect",
+    ))
+
+
+async def reflection_llm_async(npc: "NPC") -> Optional[Reflection]:
+    return _parse_reflection(await ollama_chat_stream_async(
+        _reflect_prompt(npc),
+        options=_options("reflect"),
+        format=_reflection_schema(npc),
+        system=_reflect_system(npc), call_site="reflect",
+    ))
+
+
+def reflect_llm(npc: "NPC"):
+    """Every few days, let the NPC update goals or reflect."""
+    _apply_reflection(npc, reflection_llm(npc))
+
+
+async def reflect_llm_async(npc: "NPC"):
+    _apply_reflection(npc, await reflection_llm_async(npc))
+
+
+# ============================================================
+# FUSED DAY (TWO CALLS PER DAY)
+# ============================================================
+# plan_day_llm replaces adjust_mood + choose_action, and wrap_up_day_llm
+# replaces describe_day + reflect, so a day costs two round trips.
+PLAN_DAY_ANSWER = (
+    "First judge how yesterday's events changed your mood (-10 to +10), then decide today. "
+    "Answer in JSON with the mood change, one sentence of reasoning and your action."
+)
+
+
+def _parse_plan(npc: "NPC", response: str, available_actions: List[str]) -> DayPlan:
+    return DayPlan(_parse_mood(response), _parse_action(npc, response, available_actions))
+
+
+def _apply_plan(npc: "NPC", plan: DayPlan) -> DayPlan:
+    _apply_mood(npc, plan.mood_change)
+    return plan
+
+
+def plan_day_llm(npc: "NPC", human_advice: str = None) -> DayPlan:
+    """One call for yesterday's mood delta and today's action; the delta is applied to npc.
+
+    The available actions are worked out from the mood before the delta.
+    """
+    system, prompt, available_actions = _choose_action_prompt(
+        npc, human_advice, PLAN_DAY_ANSWER, "plan_day"
+    )
+    response = ollama_chat_stream(
+        prompt, temperature=0.7,
+        options=_options("plan_day"),
+        format=_plan_day_schema(available_actions),
+        system=system, call_site="plan_day",
+    )
+    return _apply_plan(npc, _parse_plan(npc, response, available_actions))
+
+
+async def plan_day_llm_async(npc: "NPC", human_advice: str = None) -> DayPlan:
+    system, prompt, available_actions = _choose_action_prompt(
+        npc, human_advice, PLAN_DAY_ANSWER, "plan_day"
+    )
+    response = await ollama_chat_stream_async(
+        prompt, temperature=0.7,
+        options=_options("plan_day"),
+        format=_plan_day_schema(available_actions),
+        system=system, call_site="plan_day",
+    )
+    return _apply_plan(npc, _parse_plan(npc, response, available_actions))
+
+
+def _wrap_up_system(npc: "NPC", reflect: bool) -> str:
+    system = _describe_day_system(npc).replace(
+        "Write ONLY the journal entry.", "Put ONLY the journal entry in the journal field."
+    )
+    if reflect:
+        system += (
+            f"\nThen, as {npc.name}, reflect on your recent adventures and memories and "
+            "suggest any goal or mindset adjustments (if any).\n"
+        )
+        return system + "Answer in JSON with the journal entry, your updated goals and a short reflection."
+    return system + "Answer in JSON with the journal entry."
+
+
+def _wrap_up_prompt(npc: "NPC", action: str, event: str, reflect: bool) -> str:
+    sections = _describe_day_sections(npc, action, event)
+    if reflect:
+        sections += _reflect_sections(npc)
+    return _fit_prompt("wrap_up_day", _wrap_up_system(npc, reflect), sections)
+
+
+def _apply_wrap_up(npc: "NPC", response: str, reflect: bool) -> DayWrapUp:
+    data = _load_json(response) or {}
+    journal = _apply_report(npc, str(data.get("journal") or response).strip())
+    reflection = _parse_reflection(response) if reflect else None
+    _apply_reflection(npc, reflection)
+    return DayWrapUp(journal, reflection)
+
+
+def wrap_up_day_llm(npc: "NPC", action: str, event: str, reflect: bool = False) -> DayWrapUp:
+    """One call for the journal entry and, when `reflect`, the reflection; both are applied to npc."""
+    response = ollama_chat_stream(
+        _wrap_up_prompt(npc, action, event, reflect), temperature=0.6,
+        options=_options("wrap_up_day"),
+        format=_wrap_up_schema(npc, reflect),
+        system=_wrap_up_system(npc, reflect), call_site="wrap_up_day",
+    )
+    return _apply_wrap_up(npc, response, reflect)
+
+
+async def wrap_up_day_llm_async(npc: "NPC", action: str, event: str,
+                                reflect: bool = False) -> DayWrapUp:
+    response = await ollama_chat_stream_async(
+        _wrap_up_prompt(npc, action, event, reflect), temperature=0.6,
+        options=_options("wrap_up_day"),
+        format=_wrap_up_schema(npc, reflect),
+        system=_wrap_up_system(npc, reflect), call_site="wrap_up_day",
+    )
+    return _apply_wrap_up(npc, response, reflect)
@@ -1,18 +1,360 @@
-import ollama
+import asyncio
+import contextlib
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from config import (
+    LLM_BACKEND,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_PATH,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_SAVE_EVERY,
+    LLM_CACHE_SKIP,
+    LLM_KEEP_ALIVE,
+    LLM_MAX_CONCURRENCY,
+)
+from llm_backends import LLMBackend, make_backend
+from llm_cache import ResponseCache
+from telemetry import get_telemetry
+
+Format = Union[str, Dict[str, Any]]  # "json" or a JSON schema
 
 
 # ============================================================
-# OLLAMA INTERFACE
+# BACKEND
 # ============================================================
-def ollama_chat(prompt: str, model="llama3.1", temperature: float = 0.9):
+_backend: Optional[LLMBackend] = None
+
+
+def set_backend(backend: Union[str, LLMBackend], **kwargs) -> LLMBackend:
+    """Route every chat through `backend`: an LLMBackend, or a name for make_backend."""
+    global _backend
+    _backend = make_backend(backend, **kwargs) if isinstance(backend, str) else backend
+    return _backend
+
+
+def get_backend() -> LLMBackend:
+    """The current backend (LLM_BACKEND from config until set_backend is called)."""
+    if _backend is None:
+        set_backend(LLM_BACKEND)
+    return _backend
+
+
+@contextlib.contextmanager
+def use_backend(backend: Union[str, LLMBackend], **kwargs):
+    """Temporarily route chats through `backend` (e.g. a StubBackend in benchmarks)."""
+    global _backend
+    previous = _backend
+    try:
+        yield set_backend(backend, **kwargs)
+    finally:
+        _backend = previous
+
+
+# ============================================================
+# RESPONSE CACHE
+# ============================================================
+_cache: Optional[ResponseCache] = None
+
+
+def enable_cache(file_path: Optional[str] = LLM_CACHE_PATH,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 max_bytes: Optional[int] = LLM_CACHE_MAX_BYTES,
+                 save_every: int = LLM_CACHE_SAVE_EVERY) -> ResponseCache:
+    """Put a response cache in front of every ollama_chat call (except LLM_CACHE_SKIP sites)."""
+    global _cache
+    if _cache is not None:
+        _cache.flush()
+    _cache = ResponseCache(file_path, max_entries=max_entries, max_bytes=max_bytes,
+                           save_every=save_every)
+    return _cache
+
+
+def disable_cache():
+    global _cache
+    if _cache is not None:
+        _cache.flush()
+    _cache = None
+
+
+def cache_stats() -> Dict[str, Any]:
+    return _cache.stats() if _cache else {}
+
+
+if LLM_CACHE_ENABLED:
+    enable_cache()
+
+
+def _cache_lookup(prompt: str, model: str, temperature: float,
+                  options: Optional[Dict[str, Any]], use_cache: bool,
+                  format: Optional[Format] = None, system: Optional[str] = None,
+                  call_site: str = "default"):
+    """Return (key, cached_reply). key is None when the cache is not in play."""
+    if _cache is None or not use_cache or call_site in LLM_CACHE_SKIP:
+        return None, None
+    key_prompt = f"{system}\x00{prompt}" if system else prompt
+    key = ResponseCache.make_key(model, key_prompt, temperature, options, format)
+    return key, _cache.get(key)
+
+
+def _cache_store(key: Optional[str], content: str):
+    """Cache a reply; a cache that cannot be written never fails the call."""
+    if key is None or _cache is None:
+        return
     try:
-        response = ollama.chat(
+        _cache.put(key, content)
+    except Exception as e:
+        print(f"[Cache] Could not store reply: {e}")
+
+
+# ============================================================
+# TELEMETRY
+# ============================================================
+def _trace(call_site: str, model: str, started: float, key: Optional[str],
+           cached: bool = False, response=None, error: Optional[Exception] = None,
+           stream: bool = False, stopped_early: bool = False):
+    cache = "off" if key is None else "hit" if cached else "miss"
+    get_telemetry().record(
+        call_site, model, time.perf_counter() - started, cache=cache, response=response,
+        error=None if error is None else f"{type(error).__name__}: {error}",
+        stream=stream, stopped_early=stopped_early,
+    )
+
+
+def prompt_eval_stats() -> Dict[str, Dict[str, float]]:
+    """Per call site: calls, total/last prompt_eval_count and prompt eval time (ms).
+
+    When the static system prefix is reused from the server's KV cache,
+    prompt_eval_count drops to roughly the size of the dynamic suffix.
+    Only calls whose final chunk reported a count are included.
+    """
+    return {
+        site: {
+            "calls": totals["metered"],
+            "prompt_eval_count": totals["prompt_eval_count"],
+            "prompt_eval_ms": totals["prompt_eval_seconds"] * 1e3,
+            "last": totals["last_prompt_eval_count"],
+            "avg_prompt_eval_count": totals["prompt_eval_count"] / totals["metered"],
+        }
+        for site, totals in get_telemetry().stats().items() if totals["metered"]
+    }
+
+
+def _messages(prompt: str, system: Optional[str]) -> List[Dict[str, str]]:
+    """System prefix first, then the per-call suffix, so the prefix stays cacheable."""
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+# ============================================================
+# CHAT INTERFACE
+# ============================================================
+def ollama_chat(prompt: str, model="llama3.1", temperature: float = 0.9,
+                options: Optional[Dict[str, Any]] = None, use_cache: bool = True,
+                format: Optional[Format] = None, system: Optional[str] = None,
+                call_site: str = "default"):
+    """Send a chat to the current backend. Pass use_cache=False to always hit the model.
+
+    `format` is passed to Ollama's structured output: "json" or a JSON schema dict.
+    `system` is sent as a separate system message ahead of `prompt`; keep it
+    identical across calls so the server can reuse its evaluated prefix.
+    Every call is recorded in telemetry under `call_site`.
+    """
+    started = time.perf_counter()
+    key, cached = _cache_lookup(prompt, model, temperature, options, use_cache, format, system,
+                                call_site)
+    if cached is not None:
+        _trace(call_site, model, started, key, cached=True)
+        return cached
+
+    try:
+        response = get_backend().chat(
             model=model,
-            messages=[{"role": "user", "content": prompt}],
-            options={"temperature": temperature}
+            messages=_messages(prompt, system),
+            options={"temperature": temperature, **(options or {})},
+            format=format,
+            keep_alive=LLM_KEEP_ALIVE,
         )
-        return response["message"]["content"].strip()
+        content = response["message"]["content"].strip()
     except Exception as e:
         print(f"LLM error: {e}")
+        _trace(call_site, model, started, key, error=e)
         return "Get Drunk"  # fallback
 
+    _trace(call_site, model, started, key, response=response)
+    _cache_store(key, content)
+    return content
+
+
+def ollama_chat_stream(prompt: str, model="llama3.1", temperature: float = 0.9,
+                       options: Optional[Dict[str, Any]] = None, use_cache: bool = True,
+                       stop_when: Optional[Callable[[str], bool]] = None,
+                       on_token: Optional[Callable[[str], None]] = None,
+                       format: Optional[Format] = None, system: Optional[str] = None,
+                       call_site: str = "default"):
+    """Streaming ollama_chat.
+
+    `on_token` receives each chunk as it arrives. As soon as
+    `stop_when(text_so_far)` is true the stream is closed, which also stops
+    generation on the server, and the text so far is returned. (Ollama only
+    reports token counts in the final chunk, so early-stopped calls are
+    traced without them.)
+    """
+    started = time.perf_counter()
+    key, cached = _cache_lookup(prompt, model, temperature, options, use_cache, format, system,
+                                call_site)
+    if cached is not None:
+        if on_token:
+            on_token(cached)
+        _trace(call_site, model, started, key, cached=True, stream=True)
+        return cached
+
+    text = ""
+    final = None
+    stopped = False
+    try:
+        stream = get_backend().chat(
+            model=model,
+            messages=_messages(prompt, system),
+            options={"temperature": temperature, **(options or {})},
+            format=format,
+            keep_alive=LLM_KEEP_ALIVE,
+            stream=True,
+        )
+        try:
+            for part in stream:
+                chunk = part["message"]["content"]
+                text += chunk
+                if on_token and chunk:
+                    on_token(chunk)
+                if part.get("done"):
+                    final = part
+                if stop_when is not None and stop_when(text):
+                    stopped = final is None
+                    break
+        finally:
+            stream.close()
+    except Exception as e:
+        print(f"LLM error: {e}")
+        _trace(call_site, model, started, key, error=e, stream=True)
+        return text.strip() or "Get Drunk"  # fallback; partial replies are not cached
+
+    _trace(call_site, model, started, key, response=final, stream=True, stopped_early=stopped)
+    content = text.strip()
+    _cache_store(key, content)
+    return content
+
+
+# ============================================================
+# ASYNC CHAT INTERFACE
+# ============================================================
+# Backends keep their own long-lived clients; here we only cap how many
+# requests are in flight (one semaphore per event loop).
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_semaphore: Optional[asyncio.Semaphore] = None
+_max_concurrency = LLM_MAX_CONCURRENCY
+
+
+def set_max_concurrency(limit: int):
+    """Change how many async requests may be in flight at once."""
+    global _max_concurrency, _async_semaphore
+    _max_concurrency = max(1, limit)
+    _async_semaphore = None  # rebuilt on next call
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _async_loop, _async_semaphore
+    loop = asyncio.get_running_loop()
+    if _async_semaphore is None or _async_loop is not loop:
+        _async_loop = loop
+        _async_semaphore = asyncio.Semaphore(_max_concurrency)
+    return _async_semaphore
+
+
+async def ollama_chat_async(prompt: str, model="llama3.1", temperature: float = 0.9,
+                            options: Optional[Dict[str, Any]] = None,
+                            use_cache: bool = True, format: Optional[Format] = None,
+                            system: Optional[str] = None, call_site: str = "default"):
+    """Async ollama_chat: caps in-flight requests."""
+    started = time.perf_counter()
+    key, cached = _cache_lookup(prompt, model, temperature, options, use_cache, format, system,
+                                call_site)
+    if cached is not None:
+        _trace(call_site, model, started, key, cached=True)
+        return cached
+
+    try:
+        async with _get_semaphore():
+            response = await get_backend().chat_async(
+                model=model,
+                messages=_messages(prompt, system),
+                options={"temperature": temperature, **(options or {})},
+                format=format,
+                keep_alive=LLM_KEEP_ALIVE,
+            )
+        content = response["message"]["content"].strip()
+    except Exception as e:
+        print(f"LLM error: {e}")
+        _trace(call_site, model, started, key, error=e)
+        return "Get Drunk"  # fallback
+
+    _trace(call_site, model, started, key, response=response)
+    _cache_store(key, content)
+    return content
+
+
+async def ollama_chat_stream_async(prompt: str, model="llama3.1", temperature: float = 0.9,
+                                   options: Optional[Dict[str, Any]] = None,
+                                   use_cache: bool = True,
+                                   stop_when: Optional[Callable[[str], bool]] = None,
+                                   on_token: Optional[Callable[[str], None]] = None,
+                                   format: Optional[Format] = None,
+                                   system: Optional[str] = None,
+                                   call_site: str = "default"):
+    """Async ollama_chat_stream, under the same concurrency limit."""
+    started = time.perf_counter()
+    key, cached = _cache_lookup(prompt, model, temperature, options, use_cache, format, system,
+                                call_site)
+    if cached is not None:
+        if on_token:
+            on_token(cached)
+        _trace(call_site, model, started, key, cached=True, stream=True)
+        return cached
+
+    text = ""
+    final = None
+    stopped = False
+    try:
+        async with _get_semaphore():
+            stream = await get_backend().chat_async(
+                model=model,
+                messages=_messages(prompt, system),
+                options={"temperature": temperature, **(options or {})},
+                format=format,
+                keep_alive=LLM_KEEP_ALIVE,
+                stream=True,
+            )
+            try:
+                async for part in stream:
+                    chunk = part["message"]["content"]
+                    text += chunk
+                    if on_token and chunk:
+                        on_token(chunk)
+                    if part.get("done"):
+                        final = part
+                    if stop_when is not None and stop_when(text):
+                        stopped = final is None
+                        break
+            finally:
+                await stream.aclose()
+    except Exception as e:
+        print(f"LLM error: {e}")
+        _trace(call_site, model, started, key, error=e, stream=True)
+        return text.strip() or "Get Drunk"  # fallback; partial replies are not cached
+
+    _trace(call_site, model, started, key, response=final, stream=True, stopped_early=stopped)
+    content = text.strip()
+    _cache_store(key, content)
+    return content
@@ -1,10 +1,58 @@
 """
 Main entry point for the game simulation.
 This module imports and runs the simulation from the modular components.
+
+    python main.py                          # interactive, 10 days
+    python main.py --headless --days 100    # unattended, no advice, no pauses
+    python main.py --headless --advice rules
+    python main.py --headless --advice advice.txt --pace 0.5
+    python main.py --headless --fused       # two LLM calls per day instead of 3-4
+    python main.py --headless --backend stub  # no model: deterministic stand-in replies
+    python main.py --headless --trace llm_trace.jsonl --metrics llm_metrics.txt
 """
+import argparse
 from simulation import run_simulation
+from advice import advice_from_spec
+from config import LLM_BACKEND, LLM_FUSED_DAY, TELEMETRY_METRICS_PATH, TELEMETRY_TRACE_PATH
+from llm_interface import set_backend
+from telemetry import enable_telemetry
 
 
 if __name__ == "__main__":
-    run_simulation(10)
-    print("\n=== End of Program ===")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the NPC simulation.")
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--headless", action="store_true",
+                        help="run unattended (no input(), no pause between days)")
+    parser.add_argument("--advice", default=None,
+                        help="none, human, rules, or a file with one line of advice per day")
+    parser.add_argument("--pace", type=float, default=None,
+                        help="seconds to pause between days")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file path")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the last day in --checkpoint")
+    parser.add_argument("--fused", action="store_true", default=LLM_FUSED_DAY,
+                        help="one call for mood + action and one for journal + reflection")
+    parser.add_argument("--backend", default=LLM_BACKEND,
+                        help="ollama, http, subprocess, or stub (no model needed)")
+    parser.add_argument("--trace", default=TELEMETRY_TRACE_PATH,
+                        help="append one JSON line per LLM call to this file")
+    parser.add_argument("--metrics", default=TELEMETRY_METRICS_PATH,
+                        help="write LLM call totals here in OpenMetrics text format")
+    args = parser.parse_args()
+
+    set_backend(args.backend)
+    if args.trace or args.metrics:
+        enable_telemetry(args.trace, args.metrics)
+
+    run_simulation(
+        args.days,
+        seed=args.seed,
+        checkpoint_path=args.checkpoint,
+        resume=args.resume,
+        headless=args.headless,
+        advice=advice_from_spec(args.advice) if args.advice else None,
+        pace=args.pace,
+        fused=args.fused,
+    )
+    print("\n=== End of Program ===")
@@ -0,0 +1,235 @@
+"""
+Exact dynamic-programming solver for the game MDP.
+
+With health and mood on a 5-point grid and money in whole gold pieces
+(capped at the 150 win threshold), the game defined by config.py and
+NPC.apply_effect is a finite MDP. Backward induction over the days left
+gives the optimal action for every state and the best achievable win
+probability; logged LLM decisions can then be scored against it.
+
+The LLM mood adjustment at the start of each day is not modelled, and
+money is floored to whole gold after "Lose 0.5 money".
+"""
+import argparse
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import ACTIONS, ACTION_OUTCOMES, SECONDARY_OUTCOMES
+from effects import EFFECTS, Effect
+
+HEALTH_STEP = 5
+MOOD_STEP = 5
+WIN_MONEY = 150
+
+N_HEALTH = 100 // HEALTH_STEP + 1
+N_MONEY = WIN_MONEY + 1
+N_MOOD = 100 // MOOD_STEP + 1
+QUEST = ACTIONS.index("Accept a Quest")
+QUEST_MIN_HEALTH = 60   # exclusive, as in choose_action_llm
+QUEST_MIN_MOOD = 50
+
+
+def quest_available(health, mood):
+    """Whether "Accept a Quest" is offered; works on floats and on grid arrays."""
+    return (mood > QUEST_MIN_MOOD) & (health > QUEST_MIN_HEALTH)
+
+
+def state_index(health: float, money: float, mood: float, quest: bool = False) -> int:
+    """Flat index of the grid cell nearest to a real NPC state.
+
+    Rounding can land a state the game offers Quest in (mood 52, say) on a
+    cell where it is not; with `quest`, the nearest cell that offers Quest
+    is returned instead.
+    """
+    h = int(round(min(max(health, 0), 100) / HEALTH_STEP))
+    m = int(min(max(money, 0), WIN_MONEY))
+    md = int(round(min(max(mood, 0), 100) / MOOD_STEP))
+    if quest:
+        h = max(h, QUEST_MIN_HEALTH // HEALTH_STEP + 1)
+        md = max(md, QUEST_MIN_MOOD // MOOD_STEP + 1)
+    return (h * N_MONEY + m) * N_MOOD + md
+
+
+def _action_chains(action: str) -> List[tuple]:
+    """(probability, [effects...]) for every primary/secondary outcome path."""
+    chains = []
+    spec = ACTION_OUTCOMES[action]
+    for outcome, p in zip(spec["outcomes"], spec["probs"]):
+        if outcome in SECONDARY_OUTCOMES:
+            sec = SECONDARY_OUTCOMES[outcome]
+            for sub, q in zip(sec["outcomes"], sec["probs"]):
+                chains.append((p * q, [EFFECTS[outcome], EFFECTS[sub]]))
+        else:
+            chains.append((p, [EFFECTS[outcome]]))
+    total = sum(p for p, _ in chains)
+    return [(p / total, effects) for p, effects in chains]
+
+
+def _apply_grid(effect: Effect, health, money, mood):
+    """NPC.apply_effect over whole grids, keeping values on the grid."""
+    if effect.mood:
+        mood = np.clip(mood + effect.mood, 0, 100)
+    if effect.health:
+        health = np.clip(health + effect.health, 0, 100)
+    if effect.money or effect.money_multiplier != 1.0:
+        money = np.floor(np.maximum(money * effect.money_multiplier + effect.money, 0))
+    if effect.die:
+        health = np.zeros_like(health)
+    return health, money, mood
+
+
+class GameMDP:
+    """Transition structure of the discretized game."""
+
+    def __init__(self):
+        h, m, md = np.meshgrid(
+            np.arange(N_HEALTH) * HEALTH_STEP,
+            np.arange(N_MONEY, dtype=float),
+            np.arange(N_MOOD) * MOOD_STEP,
+            indexing="ij",
+        )
+        self.health = h.ravel().astype(float)
+        self.money = m.ravel()
+        self.mood = md.ravel().astype(float)
+        self.n_states = self.health.size
+
+        self.won = self.money >= WIN_MONEY
+        self.dead = ~self.won & (self.health <= 0)
+        self.quest_available = quest_available(self.health, self.mood)
+
+        # next_states[a]: (n_chains, n_states) indices, probs[a]: (n_chains,)
+        self.next_states: List[np.ndarray] = []
+        self.probs: List[np.ndarray] = []
+        for action in ACTIONS:
+            chains = _action_chains(action)
+            nxt = np.empty((len(chains), self.n_states), dtype=np.int32)
+            for c, (_, effects) in enumerate(chains):
+                h, m, md = self.health, self.money, self.mood
+                for effect in effects:
+                    h, m, md = _apply_grid(effect, h, m, md)
+                nxt[c] = self._index(h, m, md)
+            self.next_states.append(nxt)
+            self.probs.append(np.array([p for p, _ in chains]))
+
+    @staticmethod
+    def _index(health, money, mood) -> np.ndarray:
+        h = np.rint(health / HEALTH_STEP).astype(np.int64)
+        m = np.minimum(money, WIN_MONEY).astype(np.int64)
+        md = np.rint(mood / MOOD_STEP).astype(np.int64)
+        return (h * N_MONEY + m) * N_MOOD + md
+
+    def q_values(self, next_values: np.ndarray) -> np.ndarray:
+        """(n_actions, n_states) expected value of each action, -inf if unavailable."""
+        q = np.empty((len(ACTIONS), self.n_states))
+        for a in range(len(ACTIONS)):
+            q[a] = self.probs[a] @ next_values[self.next_states[a]]
+        q[QUEST, ~self.quest_available] = -np.inf
+        return q
+
+
+class MDPSolution:
+    def __init__(self, mdp: GameMDP, values: List[np.ndarray], policy: List[np.ndarray]):
+        self.mdp = mdp
+        self.values = values    # values[t]: win probability with t days left
+        self.policy = policy    # policy[t]: best action index with t days left (t >= 1)
+        self.horizon = len(values) - 1
+
+    def _t(self, days_left: int) -> int:
+        return max(0, min(days_left, self.horizon))
+
+    def win_probability(self, health=100.0, money=20.0, mood=50.0,
+                        days_left: Optional[int] = None) -> float:
+        days_left = self.horizon if days_left is None else days_left
+        return float(self.values[self._t(days_left)][state_index(health, money, mood)])
+
+    def best_action(self, health: float, money: float, mood: float, days_left: int) -> str:
+        q = self.action_values(health, money, mood, days_left)
+        return max(q, key=q.get)
+
+    def action_values(self, health: float, money: float, mood: float,
+                      days_left: int) -> Dict[str, float]:
+        """Optimal win probability after taking each available action now.
+
+        When the real state offers Quest, every action is valued at the
+        nearest grid cell that offers it too, so all of them are compared at
+        the same cell.
+        """
+        t = max(1, self._t(days_left))
+        quest = bool(quest_available(health, mood))
+        s = state_index(health, money, mood, quest=quest)
+        result = {}
+        for a, action in enumerate(ACTIONS):
+            if a == QUEST and not quest:
+                continue
+            result[action] = float(self.mdp.probs[a] @ self.values[t - 1][self.mdp.next_states[a][:, s]])
+        return result
+
+
+def solve(days: int = 30, mdp: Optional[GameMDP] = None) -> MDPSolution:
+    """Backward induction over `days` days; exact for the discretized game."""
+    mdp = mdp or GameMDP()
+    terminal = np.where(mdp.won, 1.0, 0.0)
+    values = [terminal]
+    policy = [np.zeros(mdp.n_states, dtype=np.int8)]
+    for _ in range(days):
+        q = mdp.q_values(values[-1])
+        best = q.argmax(axis=0)
+        v = q.max(axis=0)
+        v[mdp.won] = 1.0
+        v[mdp.dead] = 0.0
+        values.append(v)
+        policy.append(best.astype(np.int8))
+    return MDPSolution(mdp, values, policy)
+
+
+# ============================================================
+# SCORING LOGGED DECISIONS
+# ============================================================
+def score_decisions(decision_log: List[Dict[str, Any]], solution: MDPSolution,
+                    days: Optional[int] = None) -> Dict[str, Any]:
+    """Compare each logged action against the optimal one.
+
+    Needs the "state_before" snapshot that run_simulation logs for each
+    day; entries without it are skipped. `days` is the run length the
+    decisions were made under (defaults to the solver horizon).
+    """
+    days = solution.horizon if days is None else days
+    scored = []
+    for entry in decision_log:
+        state = entry.get("state_before")
+        if not state:
+            continue
+        days_left = days - entry["day"] + 1
+        q = solution.action_values(state["health"], state["money"], state["mood"], days_left)
+        best_action = max(q, key=q.get)
+        chosen = q.get(entry["action"], q.get("Get Drunk", 0.0))
+        scored.append({
+            "day": entry["day"],
+            "action": entry["action"],
+            "best_action": best_action,
+            "win_prob_chosen": chosen,
+            "win_prob_best": q[best_action],
+            "regret": q[best_action] - chosen,
+        })
+
+    if not scored:
+        return {"decisions": [], "scored": 0}
+    return {
+        "decisions": scored,
+        "scored": len(scored),
+        "agreement": sum(d["action"] == d["best_action"] for d in scored) / len(scored),
+        "mean_regret": sum(d["regret"] for d in scored) / len(scored),
+        "total_regret": sum(d["regret"] for d in scored),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve the game MDP exactly.")
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    solution = solve(args.days)
+    print(f"Optimal win probability over {args.days} days "
+          f"(health=100, money=20, mood=50): {solution.win_probability():.4f}")
+    print(f"Optimal first action: {solution.best_action(100, 20, 50, args.days)}")
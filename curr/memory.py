@@ -1,16 +1,88 @@
+import atexit
 import json
 import os
 import fcntl
-from typing import Dict, Any
+import tempfile
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+from config import EPISODIC_TOP_K, MEMORY_EVENT_LOG, MEMORY_LOG_COMPACT_BYTES
+from episodic import EpisodicStore
+from interned import MemoryRing
+from summaries import MemorySummaries
+
+
+# ============================================================
+# PERSISTENCE HELPERS
+# ============================================================
+def atomic_write_json(file_path: str, data: Dict[str, Any], indent: int = 2):
+    """Write JSON via temp file + rename, holding an exclusive lock on `<file>.lock`.
+
+    Readers never see a half-written file, and processes sharing a save
+    file take turns instead of interleaving writes.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    with open(f"{file_path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f, indent=indent)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, file_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def remove_memory_files(file_path: str) -> bool:
+    """Delete a save file and its event log, if present. Returns True if anything was removed."""
+    removed = False
+    for path in (file_path, f"{file_path}.log", f"{file_path}.log.compacting"):
+        if os.path.exists(path):
+            os.remove(path)
+            removed = True
+    return removed
+
+
+# Memories with unsaved changes are flushed when the interpreter exits.
+_open_memories: "weakref.WeakSet[CharacterMemory]" = weakref.WeakSet()
+
+
+@atexit.register
+def flush_all():
+    for memory in list(_open_memories):
+        memory.flush()
+        memory.wait_for_compaction()
 
 
 # ============================================================
 # MEMORY SYSTEM
 # ============================================================
 class CharacterMemory:
-    def __init__(self, name: str, file_path: str):
+    """Long-term memory for one NPC.
+
+    By default the whole document is rewritten to `file_path` on flush().
+    With `event_log=True`, changes are appended as JSON lines to
+    `<file_path>.log` instead, and `file_path` holds a periodic snapshot:
+    once the log grows past `compact_bytes` a background thread folds it
+    into a new snapshot. Every event carries a sequence number and the
+    snapshot records the last one it includes, so replay after a crash
+    never applies an event twice.
+    """
+
+    def __init__(self, name: str, file_path: str, event_log: bool = MEMORY_EVENT_LOG,
+                 compact_bytes: int = MEMORY_LOG_COMPACT_BYTES):
         self.name = name
         self.file_path = file_path
+        self.event_log = event_log
+        self.log_path = f"{file_path}.log"
+        self.compact_bytes = compact_bytes
         if os.path.exists(file_path):
             with open(file_path, "r") as f:
                 data = json.load(f)
@@ -18,75 +90,218 @@ class CharacterMemory:
             data = {
                 "traits": {"curiosity": 0.6, "greed": 0.4},
                 "goals": ["seek adventure", "earn wealth"],
-                "memory": [], 
-                "short_term": {"recent_events": []},
+                "memory": [],
             }
 
+        self._load(data)
+        self.dirty = False
+        self._pending = []
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+
+        if self.event_log:
+            self._replay(self.seq)
+        _open_memories.add(self)
+
+    def _load(self, data: Dict[str, Any]):
         self.traits = data["traits"]
         self.goals = data["goals"]
-        self.memory = []
-        
+        self.memory = MemoryRing(5)  # the last five (action, outcome) memories
+
         for entry in data["memory"]:
             if isinstance(entry, str):
                 # Parse "action → outcome" format
                 parts = entry.split(" → ", 1)
                 if len(parts) == 2:
-                    self.memory.append({"action": parts[0], "outcome": parts[1]})
+                    self.memory.append(parts[0], parts[1])
                 else:
-                    self.memory.append({"action": entry, "outcome": ""})
+                    self.memory.append(entry, "")
             else:
-                self.memory.append(entry)
-        
-        self.short_term = ShortTermMemory.from_dict(data.get("short_term", {}))
+                self.memory.append(entry["action"], entry["outcome"])
 
-    def remember(self, action: str, outcome: str):
-        """Add (action, outcome) as structured data (keep last 5)."""
-        self.memory.append({"action": action, "outcome": outcome})
-        if len(self.memory) > 5:
-            self.memory.pop(0)
+        # Older saves only have the last five memories
+        self.episodes = EpisodicStore()
+        self.episodes.extend(data.get("episodes") or list(self.memory))
+        self.summaries = MemorySummaries.from_dict(data.get("summaries", {}))
+        # Older saves also carry "short_term"; it is now a view of `memory`
+        self.short_term = ShortTermMemory(self.memory)
+        self.seq = data.get("seq", 0)
+
+    def restore(self, data: Dict[str, Any]):
+        """Replace the whole memory with a to_dict() snapshot and persist it."""
+        self.wait_for_compaction()
+        self._load(data)
+        self._pending = []
         self.save()
 
+    def remember(self, action: str, outcome: str):
+        """Add (action, outcome) as structured data (keep last 5; episodes keep the newest).
+
+        Only marks the memory dirty; call flush() (once per day) to persist.
+        """
+        self._apply({"op": "remember", "action": action, "outcome": outcome})
+        self._record({"op": "remember", "action": action, "outcome": outcome})
+
+    def fold(self, text: str):
+        """Store `text` as the summary of the window summaries.pending() is waiting on."""
+        pending = self.summaries.pending()
+        if pending is None or not text:
+            return
+        self._apply({"op": "fold", "level": pending.level, "text": text})
+        self._record({"op": "fold", "level": pending.level, "text": text})
+
+    def mark_dirty(self):
+        """Record a change made directly to traits or goals."""
+        self._record({"op": "set", "traits": self.traits, "goals": self.goals})
+
     def summarize(self) -> str:
         """Return clear summary with proper boundaries."""
         if not self.memory:
             return "No memories yet."
         
-        lines = [f"  • {mem}" for mem in self.memory[-5:]]
+        lines = [f"  • {text}" for text in self.memory.texts()]
         return "\n".join(lines)
 
+    def recall(self, situation: str, k: int = EPISODIC_TOP_K) -> str:
+        """The k older memories most similar to `situation` (beyond the five in summarize())."""
+        matches = self.episodes.search(situation, k, skip_recent=len(self.memory))
+        return "\n".join(f"  • {episode.text()}" for episode, _ in matches)
+
+    def summarize_older(self) -> str:
+        """Season, week and day summaries of everything before the last five memories."""
+        return self.summaries.render()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traits": self.traits,
+            "goals": self.goals,
+            "memory": [{"action": action, "outcome": outcome} for action, outcome in self.memory],
+            "episodes": self.episodes.to_list(),
+            "summaries": self.summaries.to_dict(),
+            "seq": self.seq,
+        }
+
+    def flush(self):
+        """Persist pending changes, if there are any."""
+        if not self.dirty:
+            return
+        if not self.event_log:
+            self.save()
+            return
+
+        with self._lock:
+            lines = "".join(json.dumps(event) + "\n" for event in self._pending)
+            self._pending = []
+            self.dirty = False
+            with open(self.log_path, "a") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            oversized = os.path.getsize(self.log_path) > self.compact_bytes
+        if oversized:
+            self.compact(background=True)
+
     def save(self):
-        with open(self.file_path, "w") as f:
-            json.dump(
-                {
-                    "traits": self.traits,
-                    "goals": self.goals,
-                    "memory": self.memory, 
-                    "short_term": self.short_term.to_dict()
-                },
-                f,
-                indent=2,
-            )
+        """Write the full memory document now (atomic and locked)."""
+        if self.event_log:
+            self.compact(background=False)
+            return
+        atomic_write_json(self.file_path, self.to_dict())
+        self.dirty = False
+
+    def compact(self, background: bool = True):
+        """Fold the event log into a fresh snapshot.
+
+        The current log is renamed aside so new events keep appending to a
+        fresh file while the snapshot is written.
+        """
+        self.wait_for_compaction()
+        with self._lock:
+            if self._pending:
+                # Snapshot covers pending events too; they need not hit the log.
+                self._pending = []
+                self.dirty = False
+            snapshot = json.loads(json.dumps(self.to_dict()))
+            rotated = f"{self.log_path}.compacting"
+            if os.path.exists(self.log_path):
+                os.replace(self.log_path, rotated)
+
+        def write_snapshot():
+            atomic_write_json(self.file_path, snapshot)
+            if os.path.exists(rotated):
+                os.remove(rotated)
+
+        if background:
+            self._compactor = threading.Thread(target=write_snapshot, daemon=True)
+            self._compactor.start()
+        else:
+            write_snapshot()
+
+    def wait_for_compaction(self):
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    def _record(self, event: Dict[str, Any]):
+        self.dirty = True
+        if self.event_log:
+            self.seq += 1
+            self._pending.append({"seq": self.seq, **event})
+
+    def _apply(self, event: Dict[str, Any]):
+        op = event["op"]
+        if op == "remember":
+            evicted = self.memory.append(event["action"], event["outcome"])
+            if evicted is not None:
+                self.summaries.add_day(*evicted)
+            self.episodes.add(event["action"], event["outcome"])
+        elif op == "fold":
+            self.summaries.fold(event["level"], event["text"])
+        elif op == "set":
+            self.traits = event["traits"]
+            self.goals = event["goals"]
+        # "short_term" events in older logs need no replay: short_term is a view of memory
+
+    def _replay(self, snapshot_seq: int):
+        """Apply logged events newer than the snapshot. A torn last line is discarded."""
+        for path in (f"{self.log_path}.compacting", self.log_path):
+            if not os.path.exists(path):
+                continue
+            good_bytes = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        break  # incomplete write at crash time
+                    good_bytes += len(line)
+                    if event.get("seq", 0) > snapshot_seq:
+                        self._apply(event)
+                        self.seq = max(self.seq, event["seq"])
+            if good_bytes < os.path.getsize(path):
+                # Drop the torn tail so new appends start on a clean line
+                with open(path, "r+b") as f:
+                    f.truncate(good_bytes)
 
 
 class ShortTermMemory:
-    def __init__(self, max_size=5):
+    """The most recent memories as "action → outcome" lines.
+
+    A read-only view of CharacterMemory.memory, so nothing is stored twice
+    and nothing needs syncing.
+    """
+
+    __slots__ = ("_records", "max_size")
+
+    def __init__(self, records: MemoryRing, max_size=5):
+        self._records = records
         self.max_size = max_size
-        self.recent_events = []
 
-    def add(self, event: str):
-        self.recent_events.append(event)
-        # keep only last N
-        if len(self.recent_events) > self.max_size:
-            self.recent_events.pop(0)
+    @property
+    def recent_events(self) -> List[str]:
+        return self._records.texts()[-self.max_size:]
 
     def to_dict(self):
         return {
             "recent_events": self.recent_events
         }
-
-    @staticmethod
-    def from_dict(data):
-        stm = ShortTermMemory()
-        stm.recent_events = data.get("recent_events", [])
-        return stm
-
@@ -0,0 +1,256 @@
+"""
+Vectorized Monte Carlo engine for the action/outcome tables.
+
+Runs many NPC trajectories at once with NumPy arrays for health, money and
+mood, sampling outcomes straight from ACTION_OUTCOMES / SECONDARY_OUTCOMES.
+Actions come from plain (non-LLM) policies, and the LLM mood adjustment
+step is not modelled, so results describe the game balance itself.
+"""
+import argparse
+import json
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from config import ACTIONS, ACTION_OUTCOMES, SECONDARY_OUTCOMES
+from effects import EFFECTS, Effect, NO_EFFECT
+
+
+# ============================================================
+# OUTCOME TABLES AS ARRAYS
+# ============================================================
+ACTION_INDEX = {action: i for i, action in enumerate(ACTIONS)}
+QUEST = ACTION_INDEX["Accept a Quest"]
+FALLBACK = ACTION_INDEX["Get Drunk"]  # same fallback as choose_action_llm
+
+WIN_MONEY = 150
+
+
+def _cumulative(probs) -> np.ndarray:
+    cum = np.cumsum(np.asarray(probs, dtype=float))
+    cum /= cum[-1]
+    cum[-1] = 1.0
+    return cum
+
+
+def _effect_row(effect: Effect):
+    return (effect.mood, effect.health, effect.money, effect.money_multiplier, effect.die)
+
+
+class OutcomeArrays:
+    """Padded cumulative-probability and effect arrays for vectorized sampling.
+
+    Primary outcomes get a global id `action * max_primary + k`. Each
+    primary id has a (possibly empty) row of secondary outcomes.
+    """
+
+    def __init__(self):
+        n_actions = len(ACTIONS)
+        self.max_primary = max(len(ACTION_OUTCOMES[a]["outcomes"]) for a in ACTIONS)
+        self.max_secondary = max(len(s["outcomes"]) for s in SECONDARY_OUTCOMES.values())
+        n_primary = n_actions * self.max_primary
+
+        # Padding uses cum=1.0 (never sampled) and a no-op effect.
+        self.primary_cum = np.ones((n_actions, self.max_primary))
+        self.primary_effects = np.tile(_effect_row(NO_EFFECT), (n_primary, 1)).astype(float)
+        self.has_secondary = np.zeros(n_primary, dtype=bool)
+        self.secondary_cum = np.ones((n_primary, self.max_secondary))
+        self.secondary_effects = np.tile(
+            _effect_row(NO_EFFECT), (n_primary, self.max_secondary, 1)
+        ).astype(float)
+
+        for a, action in enumerate(ACTIONS):
+            spec = ACTION_OUTCOMES[action]
+            self.primary_cum[a, :len(spec["probs"])] = _cumulative(spec["probs"])
+            for k, outcome in enumerate(spec["outcomes"]):
+                pid = a * self.max_primary + k
+                self.primary_effects[pid] = _effect_row(EFFECTS[outcome])
+                if outcome in SECONDARY_OUTCOMES:
+                    sec = SECONDARY_OUTCOMES[outcome]
+                    self.has_secondary[pid] = True
+                    self.secondary_cum[pid, :len(sec["probs"])] = _cumulative(sec["probs"])
+                    for s, sub in enumerate(sec["outcomes"]):
+                        self.secondary_effects[pid, s] = _effect_row(EFFECTS[sub])
+
+
+def _apply(effects: np.ndarray, health, money, mood):
+    """Vectorized NPC.apply_effect over rows of (mood, health, money, mult, die)."""
+    np.clip(mood + effects[:, 0], 0, 100, out=mood)
+    np.clip(health + effects[:, 1], 0, 100, out=health)
+    np.maximum(money * effects[:, 3] + effects[:, 2], 0, out=money)
+    health[effects[:, 4] > 0] = 0
+
+
+# ============================================================
+# POLICIES
+# ============================================================
+# A policy maps (health, money, mood, quest_available, rng) arrays to an
+# array of indices into ACTIONS. Unavailable choices fall back to Get Drunk.
+Policy = Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.random.Generator], np.ndarray]
+
+
+def random_policy(health, money, mood, quest_available, rng) -> np.ndarray:
+    """Uniform over the actions offered to the NPC that day."""
+    choice = rng.integers(0, len(ACTIONS) - 1, size=health.shape[0])
+    # Draw from the non-quest actions, then swap one slot for the quest when allowed.
+    others = np.array([i for i in range(len(ACTIONS)) if i != QUEST])
+    actions = others[choice]
+    take_quest = quest_available & (rng.random(health.shape[0]) < 1 / len(ACTIONS))
+    actions[take_quest] = QUEST
+    return actions
+
+
+def always(action: str) -> Policy:
+    """Policy that always picks `action`."""
+    index = ACTION_INDEX[action]
+
+    def policy(health, money, mood, quest_available, rng):
+        return np.full(health.shape[0], index)
+
+    policy.__name__ = f"always({action})"
+    return policy
+
+
+def guidance_policy(health, money, mood, quest_available, rng) -> np.ndarray:
+    """The DECISION GUIDANCE rules from choose_action_llm, without advice.
+
+    Critical health -> safest healing option, broke -> income, miserable ->
+    seek joy, otherwise chase quests when they are offered.
+    """
+    actions = np.where(quest_available, QUEST, ACTION_INDEX["Explore the Woods"])
+    actions = np.where(mood < 40, ACTION_INDEX["Get Drunk"], actions)
+    actions = np.where(
+        money < 20,
+        np.where(quest_available, QUEST, ACTION_INDEX["Visit the Marketplace"]),
+        actions,
+    )
+    actions = np.where(health < 40, ACTION_INDEX["Visit the Marketplace"], actions)
+    return actions
+
+
+POLICIES: Dict[str, Policy] = {
+    "random": random_policy,
+    "guidance": guidance_policy,
+    **{f"always:{action}": always(action) for action in ACTIONS},
+}
+
+
+# ============================================================
+# SIMULATION
+# ============================================================
+class MonteCarloResult:
+    def __init__(self, n: int, days: int, win_day: np.ndarray, death_day: np.ndarray):
+        self.n = n
+        self.days = days
+        self.win_day = win_day      # day of win, 0 if never won
+        self.death_day = death_day  # day of death, 0 if never died
+
+    @property
+    def win_rate(self) -> float:
+        return float(np.count_nonzero(self.win_day) / self.n)
+
+    @property
+    def death_rate(self) -> float:
+        return float(np.count_nonzero(self.death_day) / self.n)
+
+    @property
+    def timeout_rate(self) -> float:
+        return 1.0 - self.win_rate - self.death_rate
+
+    def days_histogram(self, which: str = "win") -> np.ndarray:
+        """Counts per day (index = day) of wins or deaths."""
+        days = self.win_day if which == "win" else self.death_day
+        return np.bincount(days[days > 0], minlength=self.days + 1)
+
+    def summary(self) -> Dict[str, object]:
+        def percentiles(days):
+            days = days[days > 0]
+            if days.size == 0:
+                return None
+            p = np.percentile(days, [10, 50, 90])
+            return {"mean": float(days.mean()), "p10": float(p[0]),
+                    "p50": float(p[1]), "p90": float(p[2])}
+
+        return {
+            "trajectories": self.n,
+            "days": self.days,
+            "win_rate": self.win_rate,
+            "death_rate": self.death_rate,
+            "timeout_rate": self.timeout_rate,
+            "days_to_win": percentiles(self.win_day),
+            "days_to_death": percentiles(self.death_day),
+        }
+
+
+_TABLES: Optional[OutcomeArrays] = None
+
+
+def simulate(policy: Policy, n: int = 100_000, days: int = 30, seed: Optional[int] = None,
+             health: float = 100.0, money: float = 20.0, mood: float = 50.0,
+             batch_size: int = 1_000_000) -> MonteCarloResult:
+    """Run `n` independent trajectories for up to `days` days.
+
+    Follows run_simulation's rules: a trajectory stops the first day it
+    reaches WIN_MONEY (checked first) or health 0.
+    """
+    global _TABLES
+    if _TABLES is None:
+        _TABLES = OutcomeArrays()
+    tables = _TABLES
+    rng = np.random.default_rng(seed)
+
+    win_day = np.zeros(n, dtype=np.int32)
+    death_day = np.zeros(n, dtype=np.int32)
+
+    for start in range(0, n, batch_size):
+        stop = min(start + batch_size, n)
+        size = stop - start
+        h = np.full(size, health, dtype=float)
+        m = np.full(size, money, dtype=float)
+        md = np.full(size, mood, dtype=float)
+        idx = np.arange(size)  # active trajectories in this batch
+
+        for day in range(1, days + 1):
+            if idx.size == 0:
+                break
+            hh, mm, mmd = h[idx], m[idx], md[idx]
+            quest_ok = (mmd > 50) & (hh > 60)
+
+            actions = np.asarray(policy(hh, mm, mmd, quest_ok, rng))
+            actions = np.where((actions == QUEST) & ~quest_ok, FALLBACK, actions)
+
+            u = rng.random(idx.size)
+            k = (tables.primary_cum[actions] <= u[:, None]).sum(axis=1)
+            pid = actions * tables.max_primary + k
+            _apply(tables.primary_effects[pid], hh, mm, mmd)
+
+            sec = np.flatnonzero(tables.has_secondary[pid])
+            if sec.size:
+                sec_pid = pid[sec]
+                u2 = rng.random(sec.size)
+                s = (tables.secondary_cum[sec_pid] <= u2[:, None]).sum(axis=1)
+                sh, sm, smd = hh[sec], mm[sec], mmd[sec]
+                _apply(tables.secondary_effects[sec_pid, s], sh, sm, smd)
+                hh[sec], mm[sec], mmd[sec] = sh, sm, smd
+
+            h[idx], m[idx], md[idx] = hh, mm, mmd
+
+            won = mm >= WIN_MONEY
+            died = ~won & (hh <= 0)
+            win_day[start + idx[won]] = day
+            death_day[start + idx[died]] = day
+            idx = idx[~(won | died)]
+
+    return MonteCarloResult(n, days, win_day, death_day)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo balance check for the outcome tables.")
+    parser.add_argument("--policy", default="guidance", choices=sorted(POLICIES))
+    parser.add_argument("-n", type=int, default=100_000, help="number of trajectories")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    result = simulate(POLICIES[args.policy], n=args.n, days=args.days, seed=args.seed)
+    print(json.dumps({"policy": args.policy, **result.summary()}, indent=2))
@@ -0,0 +1,125 @@
+import math
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from config import LLM_NUM_CTX
+
+# Chat template tokens Ollama adds around the system and user messages.
+TEMPLATE_TOKENS = 16
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+# ============================================================
+# TOKEN COUNTING
+# ============================================================
+def count_tokens(text: str) -> int:
+    """Estimate of the model's token count: one per punctuation mark, one per ~4 letters of a word.
+
+    It is additive over whitespace-separated words, which lets sections be
+    cut word by word without recounting. Compare with the server's
+    prompt_eval_count in telemetry to check how close it runs.
+    """
+    return sum(_word_tokens(word) for word in text.split())
+
+
+def _word_tokens(word: str) -> int:
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _PIECES.findall(word))
+
+
+def prompt_budget(system: str, num_predict: int, num_ctx: int = LLM_NUM_CTX) -> int:
+    """Tokens left for the user message once the system message and the reply are reserved."""
+    return num_ctx - num_predict - count_tokens(system) - TEMPLATE_TOKENS
+
+
+# ============================================================
+# PROMPT ASSEMBLY
+# ============================================================
+class Section(NamedTuple):
+    """One part of a prompt.
+
+    Sections are cut lowest `priority` first. `keep` says which end
+    survives a cut: "start" drops lines (then words) from the end, "end"
+    drops them from the start, None means the section is never cut. The
+    `title` line is shown only while the body is non-empty.
+    """
+    name: str
+    body: str
+    priority: int = 0
+    keep: Optional[str] = None
+    title: str = ""
+
+    def render(self) -> str:
+        if not self.body:
+            return ""
+        return f"{self.title}\n{self.body}" if self.title else self.body
+
+
+class AssembledPrompt(NamedTuple):
+    text: str
+    tokens: int
+    budget: int
+    usage: Dict[str, int]   # section name -> tokens after fitting
+    trimmed: List[str]      # sections that were cut (or dropped)
+
+
+def assemble(sections: List[Section], budget: int) -> AssembledPrompt:
+    """Join `sections` in order, cutting low-priority ones until the total fits `budget`.
+
+    Sections with keep=None are never cut, so the result can still be
+    over budget if they alone exceed it; `tokens` reports the real total.
+    """
+    sections = [section for section in sections if section.body]
+    usage = {section.name: count_tokens(section.render()) for section in sections}
+    over = sum(usage.values()) - budget
+    trimmed = []
+    for i in sorted(range(len(sections)), key=lambda i: sections[i].priority):
+        if over <= 0:
+            break
+        section = sections[i]
+        if section.keep is None:
+            continue
+        allowed = usage[section.name] - over - count_tokens(section.title)
+        body = _fit(section.body, allowed, section.keep)
+        sections[i] = section._replace(body=body)
+        tokens = count_tokens(sections[i].render())
+        over -= usage[section.name] - tokens
+        usage[section.name] = tokens
+        trimmed.append(section.name)
+
+    text = "\n\n".join(section.render() for section in sections if section.body) + "\n"
+    return AssembledPrompt(text, sum(usage.values()), budget, usage, trimmed)
+
+
+def _fit(body: str, allowed: int, keep: str) -> str:
+    """Cut whole lines from the far end of `body`, then words of the last line, to fit `allowed`."""
+    if allowed <= 0:
+        return ""
+    lines = body.splitlines()
+    cost = [count_tokens(line) for line in lines]
+    while lines and sum(cost) > allowed:
+        if len(lines) > 1:
+            drop = 0 if keep == "end" else -1
+            lines.pop(drop)
+            cost.pop(drop)
+            continue
+        lines = [_cut_words(lines[0], allowed, keep)]
+        break
+    return "\n".join(line for line in lines if line)
+
+
+def _cut_words(line: str, allowed: int, keep: str) -> str:
+    words = line.split()
+    if keep == "end":
+        words.reverse()
+    kept, used = [], 1  # one token for the ellipsis
+    for word in words:
+        used += _word_tokens(word)
+        if used > allowed:
+            break
+        kept.append(word)
+    if not kept:
+        return ""
+    if keep == "end":
+        return "… " + " ".join(reversed(kept))
+    return " ".join(kept) + " …"
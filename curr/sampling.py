@@ -0,0 +1,54 @@
+import random
+from typing import Dict, Generic, List, Sequence, TypeVar
+from config import ACTION_OUTCOMES, SECONDARY_OUTCOMES
+
+T = TypeVar("T")
+
+
+# ============================================================
+# ALIAS-METHOD SAMPLING
+# ============================================================
+class AliasTable(Generic[T]):
+    """Walker/Vose alias table: O(n) to build, O(1) per draw."""
+
+    __slots__ = ("items", "prob", "alias")
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float]):
+        if len(items) != len(weights) or not items:
+            raise ValueError("items and weights must be non-empty and the same length")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("weights must sum to a positive value")
+
+        n = len(items)
+        self.items: List[T] = list(items)
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Leftovers are 1.0 up to rounding error
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng: random.Random) -> T:
+        """Draw one item using a single uniform from `rng`."""
+        u = rng.random() * len(self.prob)
+        i = int(u)
+        return self.items[i] if u - i < self.prob[i] else self.items[self.alias[i]]
+
+
+def build_samplers(table: Dict[str, Dict[str, List]]) -> Dict[str, AliasTable[str]]:
+    return {key: AliasTable(spec["outcomes"], spec["probs"]) for key, spec in table.items()}
+
+
+OUTCOME_SAMPLERS = build_samplers(ACTION_OUTCOMES)
+SECONDARY_SAMPLERS = build_samplers(SECONDARY_OUTCOMES)
@@ -1,71 +1,201 @@
+import asyncio
 import json
+import threading
 import time
-import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from npc import NPC
+from memory import remove_memory_files
+from checkpoint import checkpoint_document, load_checkpoint, write_checkpoint
+from config import (
+    CHECKPOINT_EVERY,
+    DAY_PACE_SECONDS,
+    LLM_FUSED_DAY,
+    LLM_SPECULATE,
+    LLM_STREAM_JOURNAL,
+)
+from advice import AdviceProvider, HumanAdvice, NoAdvice
 from actions import perform_action
+from llm_interface import set_max_concurrency
+from telemetry import get_telemetry
 from llm_decisions import (
-    get_human_input,
+    show_reasoning,
+    decide_action_llm,
     choose_action_llm,
     describe_day_llm,
     adjust_mood_llm,
-    reflect_llm
+    reflect_llm,
+    choose_action_llm_async,
+    describe_day_llm_async,
+    adjust_mood_llm_async,
+    reflect_llm_async,
+    plan_day_llm,
+    wrap_up_day_llm,
+    plan_day_llm_async,
+    wrap_up_day_llm_async,
 )
 
 
+# ============================================================
+# SPECULATIVE DECISIONS
+# ============================================================
+class _Speculation:
+    """Today's mood adjustment and a no-advice choice, run while the player thinks.
+
+    Both run in order on a single worker thread. The mood adjustment is
+    always kept. The choice is used if no advice comes; otherwise it is
+    cancelled, or, if it is already in flight, its stream is closed so the
+    server stops generating it. The choice is tagged "choose_action_speculative"
+    in telemetry, so abandoned ones are not counted as real choose_action calls.
+    """
+
+    CALL_SITE = "choose_action_speculative"
+
+    def __init__(self, executor: ThreadPoolExecutor, npc: NPC):
+        self.abandoned = threading.Event()
+        self.mood = executor.submit(adjust_mood_llm, npc)
+        self.choice = executor.submit(decide_action_llm, npc, None, False,
+                                      lambda _text: self.abandoned.is_set(), self.CALL_SITE)
+
+    def action(self, npc: NPC, human_advice: Optional[str]) -> str:
+        if human_advice is None:
+            decision = self.choice.result()
+            show_reasoning(npc, decision)
+            return decision.action
+        self.abandoned.set()
+        self.choice.cancel()
+        return choose_action_llm(npc, human_advice)
+
+
 # ============================================================
 # MAIN SIMULATION LOOP
 # ============================================================
-def run_simulation(days: int = 10):
-    state_file = "aldric_state.json"
-    if os.path.exists(state_file):
-        os.remove(state_file)
-        print(f"[System] Cleared previous save file: {state_file}")
+def run_simulation(days: int = 10, seed: Optional[int] = None,
+                   checkpoint_path: Optional[str] = None,
+                   checkpoint_every: int = CHECKPOINT_EVERY, resume: bool = False,
+                   headless: bool = False, advice: Optional[AdviceProvider] = None,
+                   pace: Optional[float] = None, fused: bool = LLM_FUSED_DAY,
+                   speculate: bool = LLM_SPECULATE):
+    """Single-NPC game loop.
+
+    Advice comes from `advice` (default: the player at the keyboard, or no
+    advice when `headless`). `pace` is the pause between days in seconds
+    (default: DAY_PACE_SECONDS, or 0 when `headless`).
+
+    With `checkpoint_path`, the full NPC, memory and RNG state is saved every
+    `checkpoint_every` days and when the run ends; `resume=True` continues
+    from the last completed day in that checkpoint.
+
+    With `fused`, each day makes two LLM calls instead of three or four:
+    plan_day_llm (mood + action) and wrap_up_day_llm (journal + reflection).
+
+    With `speculate`, while a blocking advice provider (the player) is
+    deciding, the mood adjustment and a no-advice choice are already sent to
+    the LLM. The choice is used if the player gives no advice.
+    """
+    if advice is None:
+        advice = NoAdvice() if headless else HumanAdvice()
+    if pace is None:
+        pace = 0.0 if headless else DAY_PACE_SECONDS
 
-    npc = NPC()
-    print(f"=== Beginning Simulation with {npc.name} ===")
+    restored = load_checkpoint(checkpoint_path) if resume and checkpoint_path else None
+    if restored:
+        npc, start_day = restored
+        print(f"=== Resuming Simulation with {npc.name} after day {start_day} ===")
+    else:
+        state_file = "aldric_state.json"
+        if remove_memory_files(state_file):
+            print(f"[System] Cleared previous save file: {state_file}")
 
+        npc = NPC(seed=seed)
+        start_day = 0
+        print(f"=== Beginning Simulation with {npc.name} ===")
+
+    executor = ThreadPoolExecutor(max_workers=1) if speculate and advice.blocking else None
+    # Last fully completed day, and its closing mood while a later day has changed
+    # nothing else (until the action is performed a day only adjusts the mood);
+    # None once it has. Lets Ctrl-C save that day without a copy per day.
+    completed_day, completed_mood = start_day, npc.mood
+    speculation = None
     try:
-        for day in range(1, days + 1):
+        for day in range(start_day + 1, days + 1):
+            if npc.won() or not npc.alive():
+                break  # resumed a run that had already ended
+
             print(f"\n--- DAY {day} ---")
             print(f"Current State: Health={npc.health}, Money={npc.money}, Mood={npc.mood}")
 
-            adjust_mood_llm(npc)
-            if not npc.alive():
-                print("NPC has died. Simulation ends.")
-                break
+            if fused:
+                human_advice = None if day == 1 else advice.advise(npc, day)
+                action = plan_day_llm(npc, human_advice).decision.action
+                state_before = npc.state()
+            else:
+                speculation = None
+                if executor and day > 1:
+                    speculation = _Speculation(executor, npc)
+                    human_advice = advice.advise(npc, day)
+                    speculation.mood.result()
+                else:
+                    adjust_mood_llm(npc)
+                if not npc.alive():
+                    print("NPC has died. Simulation ends.")
+                    break
 
-            human_advice = None if day == 1 else get_human_input()
-            action = choose_action_llm(npc, human_advice)
+                state_before = npc.state()
+                if speculation is None:
+                    human_advice = None if day == 1 else advice.advise(npc, day)
+                    action = choose_action_llm(npc, human_advice)
+                else:
+                    action = speculation.action(npc, human_advice)
             print(f"Chosen action: {action}")
 
+            completed_mood = None
             event = perform_action(npc, action)
             print(f"Outcome: {event}")
 
-            eod_report = describe_day_llm(npc, action, event)
-            print(f"Report:\n{eod_report}")
+            if fused:
+                reflect = day % 3 == 0 and npc.alive() and not npc.won()
+                eod_report = wrap_up_day_llm(npc, action, event, reflect).journal
+                print(f"Report:\n{eod_report}")
+            elif LLM_STREAM_JOURNAL:
+                print("Report:")
+                describe_day_llm(npc, action, event,
+                                 on_token=lambda chunk: print(chunk, end="", flush=True))
+                print()
+            else:
+                eod_report = describe_day_llm(npc, action, event)
+                print(f"Report:\n{eod_report}")
 
             npc.decision_log.append({
                 "day": day,
                 "action": action,
                 "outcome": event,
                 "human_advice": human_advice,
+                "state_before": state_before,
                 "state": npc.state()
             })
 
+            ended = npc.won() or not npc.alive()
             if npc.won():
                 print(f"{npc.name} has achieved wealth and wins the game!")
-                break
-            if not npc.alive():
+            elif not npc.alive():
                 print(f"{npc.name} has died. Final State: {npc.state()}")
-                break
-
-            if day % 3 == 0:
+            elif day % 3 == 0 and not fused:
                 reflect_llm(npc)
 
-            time.sleep(1)
+            npc.memory.flush()  # one write per simulated day
+            completed_day, completed_mood = day, npc.mood
+            if checkpoint_path and (ended or day == days or day % checkpoint_every == 0):
+                write_checkpoint(checkpoint_document(npc, day), checkpoint_path)
+            if ended:
+                break
+
+            if pace > 0:
+                time.sleep(pace)
 
         print("\n=== End of Simulation ===")
         print(json.dumps(npc.decision_log, indent=2))
+        print_llm_stats()
         
     except KeyboardInterrupt:
         print("\n\n=== SIMULATION INTERRUPTED ===")
@@ -77,5 +207,139 @@ def run_simulation(days: int = 10):
         
         print("\nRecent Adventures:")
         print(npc.memory.summarize())
-    
-    return npc
\ No newline at end of file
+
+        if checkpoint_path and completed_day > start_day:
+            if completed_mood is not None:
+                document = checkpoint_document(npc, completed_day)
+                document["npc"]["mood"] = completed_mood  # undo today's mood adjustment
+                write_checkpoint(document, checkpoint_path)
+                print(f"\n[System] Checkpoint saved after day {completed_day}; continue with --resume")
+            else:
+                print(f"\n[System] Day {completed_day + 1} was interrupted mid-action; "
+                      f"--resume continues from the last checkpoint")
+    finally:
+        if speculation is not None:
+            speculation.abandoned.set()  # close an in-flight speculative stream
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+        npc.memory.flush()
+
+    return npc
+
+
+def print_llm_stats():
+    """Per call site LLM totals, then write the telemetry metrics file if one is configured.
+
+    A low average prompt token count means the static prefix was reused.
+    """
+    telemetry = get_telemetry()
+    stats = telemetry.stats()
+    if stats:
+        print("\nLLM calls per call site:")
+    for site, totals in sorted(stats.items()):
+        metered = totals["metered"] or 1
+        print(f"  {site}: {totals['calls']} calls, "
+              f"avg {totals['prompt_eval_count'] / metered:.0f} prompt / "
+              f"{totals['eval_count'] / metered:.0f} completion tokens, "
+              f"{totals['wall_seconds']:.1f}s wall, "
+              f"{totals['cache_hits']} cached, {totals['errors']} errors, "
+              f"{totals['early_stops']} stopped early")
+    prompts = telemetry.prompt_stats()
+    if prompts:
+        print("Prompt budgets (estimated tokens):")
+    for site, totals in sorted(prompts.items()):
+        print(f"  {site}: avg {totals['tokens'] / totals['prompts']:.0f} / max "
+              f"{totals['max_tokens']} of {totals['budget']}, "
+              f"{totals['trimmed']} trimmed, {totals['over_budget']} over budget")
+    telemetry.write_metrics()
+
+
+# ============================================================
+# POPULATION SIMULATION
+# ============================================================
+def run_population(npc_count: int = 10, days: int = 10,
+                   concurrency: Optional[int] = None,
+                   seed: Optional[int] = None,
+                   fused: bool = LLM_FUSED_DAY) -> List[NPC]:
+    """Run many NPCs side by side, one phase at a time.
+
+    Every phase (mood, choose, act, describe, reflect) is applied to all
+    active NPCs before the next one starts, and each phase's LLM calls are
+    sent concurrently. A day therefore costs a few rounds of inference
+    latency instead of one round per NPC. With `seed`, NPC i draws its
+    outcomes from its own stream seeded with `seed + i`. `fused` works as in
+    run_simulation.
+    """
+    if concurrency is not None:
+        set_max_concurrency(concurrency)
+    return asyncio.run(_run_population(npc_count, days, seed, fused))
+
+
+async def _run_population(npc_count: int, days: int, seed: Optional[int],
+                          fused: bool) -> List[NPC]:
+    npcs = []
+    for i in range(npc_count):
+        name = "Aldric" if i == 0 else f"Aldric{i + 1}"
+        remove_memory_files(f"{name.lower()}_state.json")
+        npcs.append(NPC(name=name, seed=None if seed is None else seed + i))
+    print(f"=== Beginning Population Simulation with {npc_count} NPCs ===")
+
+    for day in range(1, days + 1):
+        active = [npc for npc in npcs if npc.alive() and not npc.won()]
+        if not active:
+            break
+        print(f"\n--- DAY {day} ({len(active)} active) ---")
+
+        if fused:
+            plans = await asyncio.gather(*(plan_day_llm_async(npc) for npc in active))
+            actions = [plan.decision.action for plan in plans]
+            states_before = [npc.state() for npc in active]
+        else:
+            await asyncio.gather(*(adjust_mood_llm_async(npc) for npc in active))
+            active = [npc for npc in active if npc.alive()]
+
+            states_before = [npc.state() for npc in active]
+            actions = await asyncio.gather(*(choose_action_llm_async(npc) for npc in active))
+        events = [perform_action(npc, action) for npc, action in zip(active, actions)]
+
+        if fused:
+            await asyncio.gather(*(
+                wrap_up_day_llm_async(npc, action, event,
+                                      day % 3 == 0 and npc.alive() and not npc.won())
+                for npc, action, event in zip(active, actions, events)
+            ))
+        else:
+            await asyncio.gather(*(
+                describe_day_llm_async(npc, action, event)
+                for npc, action, event in zip(active, actions, events)
+            ))
+
+        for npc, action, event, state_before in zip(active, actions, events, states_before):
+            npc.decision_log.append({
+                "day": day,
+                "action": action,
+                "outcome": event,
+                "human_advice": None,
+                "state_before": state_before,
+                "state": npc.state()
+            })
+            print(f"{npc.name}: {action} → {event}")
+            if npc.won():
+                print(f"{npc.name} has achieved wealth and wins the game!")
+            elif not npc.alive():
+                print(f"{npc.name} has died. Final State: {npc.state()}")
+
+        if day % 3 == 0 and not fused:
+            await asyncio.gather(*(
+                reflect_llm_async(npc) for npc in active if npc.alive() and not npc.won()
+            ))
+
+        for npc in active:
+            npc.memory.flush()
+
+    print("\n=== End of Population Simulation ===")
+    won = sum(npc.won() for npc in npcs)
+    died = sum(not npc.alive() for npc in npcs)
+    print(f"Won: {won}  Died: {died}  Still going: {len(npcs) - won - died}")
+    print_llm_stats()
+    return npcs
@@ -0,0 +1,111 @@
+import textwrap
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+from config import SUMMARY_DAYS_PER_WEEK, SUMMARY_MAX_SEASONS, SUMMARY_WEEKS_PER_SEASON
+from interned import pack, unpack_text
+
+
+# ============================================================
+# HIERARCHICAL MEMORY SUMMARIES
+# ============================================================
+class Fold(NamedTuple):
+    """A full window waiting to be condensed into one summary of `level`."""
+    level: str  # "week", "season" or "long_ago"
+    texts: List[str]
+
+
+class MemorySummaries:
+    """Day, week and season summaries of memories older than the recent window.
+
+    Evicted memories arrive one at a time as day lines, kept packed (see
+    interned.pack) until they are shown. Once a window is
+    full (a week of days, a season of weeks, or one season too many),
+    `pending()` returns just that window; the summary the LLM writes for it
+    is stored with `fold()`. Only the newest window is ever summarized, so
+    the rendered text stays a bounded size however long the game runs.
+
+    If folds fall behind (no reflection, unusable replies), a level that
+    reaches twice its window is condensed without the LLM by shortening
+    and joining its oldest window.
+    """
+
+    def __init__(self, days_per_week: int = SUMMARY_DAYS_PER_WEEK,
+                 weeks_per_season: int = SUMMARY_WEEKS_PER_SEASON,
+                 max_seasons: int = SUMMARY_MAX_SEASONS):
+        self.days_per_week = days_per_week
+        self.weeks_per_season = weeks_per_season
+        self.max_seasons = max_seasons
+        self.days: List[Union[int, str]] = []  # packed (action, outcome) pairs
+        self.weeks: List[str] = []
+        self.seasons: List[str] = []
+        self.long_ago = ""
+
+    def add_day(self, action: str, outcome: str):
+        self.days.append(pack(action, outcome))
+        self._condense_overflow()
+
+    def pending(self) -> Optional[Fold]:
+        """The oldest full window, if any, that is waiting for a summary."""
+        for level in ("week", "season", "long_ago"):
+            texts = self._window(level)
+            if texts is not None:
+                return Fold(level, texts)
+        return None
+
+    def _window(self, level: str) -> Optional[List[str]]:
+        if level == "week" and len(self.days) >= self.days_per_week:
+            return [unpack_text(day) for day in self.days[:self.days_per_week]]
+        if level == "season" and len(self.weeks) >= self.weeks_per_season:
+            return self.weeks[:self.weeks_per_season]
+        if level == "long_ago" and len(self.seasons) > self.max_seasons:
+            return [text for text in (self.long_ago, self.seasons[0]) if text]
+        return None
+
+    def fold(self, level: str, text: str):
+        """Replace the pending `level` window with its summary `text`."""
+        if level == "week":
+            del self.days[:self.days_per_week]
+            self.weeks.append(text)
+        elif level == "season":
+            del self.weeks[:self.weeks_per_season]
+            self.seasons.append(text)
+        elif level == "long_ago":
+            del self.seasons[0]
+            self.long_ago = text
+        self._condense_overflow()
+
+    def _condense_overflow(self):
+        backlog = {"week": (self.days, self.days_per_week),
+                   "season": (self.weeks, self.weeks_per_season),
+                   "long_ago": (self.seasons, self.max_seasons)}
+        for level, (entries, window) in backlog.items():
+            while len(entries) >= 2 * window:
+                self.fold(level, _condense(self._window(level)))
+
+    def render(self) -> str:
+        """Oldest first: long ago, seasons, weeks, then single days."""
+        lines = []
+        if self.long_ago:
+            lines.append(f"  • Long ago: {self.long_ago}")
+        lines += [f"  • A past season: {text}" for text in self.seasons]
+        lines += [f"  • A past week: {text}" for text in self.weeks]
+        lines += [f"  • {unpack_text(day)}" for day in self.days]
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"days": [unpack_text(day) for day in self.days], "weeks": self.weeks, "seasons": self.seasons,
+                "long_ago": self.long_ago}
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "MemorySummaries":
+        summaries = MemorySummaries()
+        summaries.days = [pack(*text.split(" → ", 1)) if " → " in text else text
+                          for text in data.get("days", [])]
+        summaries.weeks = list(data.get("weeks", []))
+        summaries.seasons = list(data.get("seasons", []))
+        summaries.long_ago = data.get("long_ago", "")
+        return summaries
+
+
+def _condense(texts: List[str], width: int = 60) -> str:
+    return "; ".join(textwrap.shorten(text, width, placeholder="...") for text in texts)
@@ -0,0 +1,209 @@
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import TELEMETRY_METRICS_PATH, TELEMETRY_TRACE_PATH
+
+
+# ============================================================
+# LLM CALL TELEMETRY
+# ============================================================
+# Ollama's final response carries token counts and durations (in ns).
+_DURATIONS = ("prompt_eval_duration", "eval_duration", "load_duration", "total_duration")
+
+# OpenMetrics counter families: name -> (aggregate field, help text)
+_COUNTERS = {
+    "llm_calls": ("calls", "LLM calls."),
+    "llm_errors": ("errors", "LLM calls that failed and returned the fallback."),
+    "llm_cache_hits": ("cache_hits", "Calls answered from the response cache."),
+    "llm_early_stops": ("early_stops", "Streams closed early by stop_when."),
+    "llm_prompt_tokens": ("prompt_eval_count", "Prompt tokens evaluated by the server."),
+    "llm_completion_tokens": ("eval_count", "Tokens generated."),
+    "llm_prompt_eval_seconds": ("prompt_eval_seconds", "Server time spent evaluating prompts."),
+    "llm_eval_seconds": ("eval_seconds", "Server time spent generating."),
+    "llm_load_seconds": ("load_seconds", "Server time spent loading the model."),
+    "llm_wall_seconds": ("wall_seconds", "Client-side wall time per call, including queueing."),
+}
+
+# Counter families for assembled prompts, labelled by call_site only.
+_PROMPT_COUNTERS = {
+    "llm_prompts_assembled": ("prompts", "Prompts fitted to a token budget."),
+    "llm_prompts_trimmed": ("trimmed", "Prompts that had sections cut to fit."),
+    "llm_prompts_over_budget": ("over_budget", "Prompts still over budget after cutting."),
+    "llm_prompt_estimated_tokens": ("tokens", "Estimated user-message tokens after fitting."),
+}
+
+
+class Telemetry:
+    """Per-call records of every LLM request, aggregated by (call_site, model).
+
+    Each call is appended to `trace_path` as one JSON line when it is set.
+    `write_metrics()` writes the aggregates in OpenMetrics text format to
+    `metrics_path`. Safe to use from several threads.
+    """
+
+    def __init__(self, trace_path: Optional[str] = None, metrics_path: Optional[str] = None):
+        self.trace_path = trace_path
+        self.metrics_path = metrics_path
+        self.totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.prompts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._trace = open(trace_path, "a", buffering=1) if trace_path else None
+
+    def record(self, call_site: str, model: str, wall_seconds: float, cache: str = "off",
+               response: Optional[Any] = None, error: Optional[str] = None,
+               stream: bool = False, stopped_early: bool = False) -> Dict[str, Any]:
+        """Log one call. `cache` is "hit", "miss" or "off"; `response` is the final chunk, if any."""
+        entry: Dict[str, Any] = {
+            "ts": time.time(),
+            "call_site": call_site,
+            "model": model,
+            "stream": stream,
+            "cache": cache,
+            "wall_ms": wall_seconds * 1e3,
+        }
+        if response is not None:
+            for field in ("prompt_eval_count", "eval_count"):
+                value = response.get(field)
+                if value is not None:
+                    entry[field] = value
+            for field in _DURATIONS:
+                value = response.get(field)
+                if value is not None:
+                    entry[field.replace("_duration", "_ms")] = value / 1e6
+            if entry.get("eval_count") and entry.get("eval_ms"):
+                entry["tokens_per_sec"] = entry["eval_count"] / (entry["eval_ms"] / 1e3)
+        if stopped_early:
+            entry["stopped_early"] = True
+        if error is not None:
+            entry["error"] = error
+
+        with self._lock:
+            self._aggregate(entry)
+            if self._trace:
+                self._trace.write(json.dumps(entry) + "\n")
+        return entry
+
+    def _aggregate(self, entry: Dict[str, Any]):
+        totals = self.totals.setdefault((entry["call_site"], entry["model"]), {
+            "calls": 0, "errors": 0, "cache_hits": 0, "early_stops": 0, "metered": 0,
+            "prompt_eval_count": 0, "eval_count": 0, "last_prompt_eval_count": 0,
+            "prompt_eval_seconds": 0.0, "eval_seconds": 0.0, "load_seconds": 0.0,
+            "wall_seconds": 0.0,
+        })
+        totals["calls"] += 1
+        totals["wall_seconds"] += entry["wall_ms"] / 1e3
+        totals["errors"] += "error" in entry
+        totals["cache_hits"] += entry["cache"] == "hit"
+        totals["early_stops"] += entry.get("stopped_early", False)
+        if "prompt_eval_count" in entry:
+            totals["metered"] += 1
+            totals["prompt_eval_count"] += entry["prompt_eval_count"]
+            totals["last_prompt_eval_count"] = entry["prompt_eval_count"]
+        totals["eval_count"] += entry.get("eval_count", 0)
+        totals["prompt_eval_seconds"] += entry.get("prompt_eval_ms", 0.0) / 1e3
+        totals["eval_seconds"] += entry.get("eval_ms", 0.0) / 1e3
+        totals["load_seconds"] += entry.get("load_ms", 0.0) / 1e3
+
+    def record_prompt(self, call_site: str, tokens: int, budget: int, trimmed: List[str]):
+        """Count one assembled prompt: its estimated size, its budget and the sections cut."""
+        with self._lock:
+            totals = self.prompts.setdefault(call_site, {
+                "prompts": 0, "trimmed": 0, "over_budget": 0, "tokens": 0,
+                "max_tokens": 0, "budget": 0,
+            })
+            totals["prompts"] += 1
+            totals["trimmed"] += bool(trimmed)
+            totals["over_budget"] += tokens > budget
+            totals["tokens"] += tokens
+            totals["max_tokens"] = max(totals["max_tokens"], tokens)
+            totals["budget"] = budget
+
+    def prompt_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {site: dict(totals) for site, totals in self.prompts.items()}
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Aggregates per call site (summed over models)."""
+        by_site: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for (site, _), totals in self.totals.items():
+                merged = by_site.setdefault(site, dict.fromkeys(totals, 0))
+                for field, value in totals.items():
+                    if field == "last_prompt_eval_count":
+                        merged[field] = value or merged[field]
+                    else:
+                        merged[field] += value
+        return by_site
+
+    def openmetrics(self) -> str:
+        lines = []
+        with self._lock:
+            series = sorted(self.totals.items())
+            prompts = sorted(self.prompts.items())
+        for family, (field, help_text) in _COUNTERS.items():
+            lines.append(f"# TYPE {family} counter")
+            lines.append(f"# HELP {family} {help_text}")
+            for (site, model), totals in series:
+                lines.append(f'{family}_total{{call_site="{_escape(site)}",'
+                             f'model="{_escape(model)}"}} {totals[field]}')
+        for family, (field, help_text) in _PROMPT_COUNTERS.items():
+            lines.append(f"# TYPE {family} counter")
+            lines.append(f"# HELP {family} {help_text}")
+            for site, totals in prompts:
+                lines.append(f'{family}_total{{call_site="{_escape(site)}"}} {totals[field]}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path: Optional[str] = None):
+        """Write the OpenMetrics text file (temp file + rename)."""
+        path = path or self.metrics_path
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.openmetrics())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self.totals.clear()
+            self.prompts.clear()
+
+    def close(self):
+        self.write_metrics()
+        with self._lock:
+            if self._trace:
+                self._trace.close()
+                self._trace = None
+
+
+def _escape(label: str) -> str:
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# ============================================================
+# PROCESS-WIDE INSTANCE
+# ============================================================
+_telemetry = Telemetry(TELEMETRY_TRACE_PATH, TELEMETRY_METRICS_PATH)
+
+
+def get_telemetry() -> Telemetry:
+    return _telemetry
+
+
+def enable_telemetry(trace_path: Optional[str] = None,
+                     metrics_path: Optional[str] = None) -> Telemetry:
+    """Start a fresh Telemetry writing JSONL traces and/or an OpenMetrics file."""
+    global _telemetry
+    _telemetry.close()
+    _telemetry = Telemetry(trace_path, metrics_path)
+    return _telemetry
+
+
+@atexit.register
+def _close_telemetry():
+    _telemetry.close()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The game modules import each other by bare name (from config import ...).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "curr"))
+
+# Manual scripts that talk to a live model or run a server, not tests.
+collect_ignore = ["llm_backend.py", "llm_backend_test.py"]
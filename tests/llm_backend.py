@@ -1,14 +1,73 @@
 """
 Simple FastAPI backend to interface with Gemma via Ollama
 Decides character actions from LLM reasoning
+
+One shared backend client (pooled HTTP connections) serves every request.
+Requests that arrive within a few milliseconds of each other are
+micro-batched: they are sent to the model as one wave, and identical
+prompts in a wave share a single LLM call. At most
+DECISION_MAX_CONCURRENCY calls are in flight, and each one is bounded by
+DECISION_TIMEOUT seconds from the moment it starts; time spent queued
+does not count. A /decide request that waits in the queue longer than
+DECISION_QUEUE_TIMEOUT seconds is answered with 503. When every caller
+waiting on a prompt has gone away, its LLM call is skipped, or cancelled
+if it is already running.
+
+    uvicorn llm_backend:app --workers 1
+    DECISION_BACKEND=stub uvicorn llm_backend:app   # no model, for load tests
+
+Endpoints:
+    POST /decide          one CharacterState -> one decision
+    POST /decide/batch    list of CharacterState -> decisions in the same order
+    POST /decide/stream   list of CharacterState -> NDJSON, one line per decision
+                          as soon as it is ready ({"index", "name", "decision"})
+    GET  /stats           batching counters
+
+Settings (environment variables): DECISION_MODEL, DECISION_BACKEND,
+DECISION_HOST, DECISION_TIMEOUT, DECISION_QUEUE_TIMEOUT, DECISION_MAX_CONCURRENCY,
+DECISION_BATCH_WINDOW_MS, DECISION_MAX_BATCH, DECISION_MAX_STATES.
 """
 
-from fastapi import FastAPI
-from pydantic import BaseModel
-import subprocess
+import asyncio
 import json
+import os
+import sys
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "curr"))
+from llm_backends import LLMBackend, make_backend  # noqa: E402
+
+MODEL = os.environ.get("DECISION_MODEL", "gemma:2b")
+BACKEND = os.environ.get("DECISION_BACKEND", "ollama")
+HOST = os.environ.get("DECISION_HOST")  # None = OLLAMA_HOST or localhost
+TIMEOUT = float(os.environ.get("DECISION_TIMEOUT", "30"))  # per LLM call, from when it starts
+QUEUE_TIMEOUT = float(os.environ.get("DECISION_QUEUE_TIMEOUT", "300"))  # whole /decide request
+MAX_CONCURRENCY = int(os.environ.get("DECISION_MAX_CONCURRENCY", "8"))
+BATCH_WINDOW = float(os.environ.get("DECISION_BATCH_WINDOW_MS", "5")) / 1000
+MAX_BATCH = int(os.environ.get("DECISION_MAX_BATCH", "32"))
+MAX_STATES = int(os.environ.get("DECISION_MAX_STATES", "1000"))  # per batch/stream request
+
+ACTIONS = ["Adventure in Forest", "Rob Merchant", "Scout Town"]
+
+DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "chosen_action": {"type": "string", "enum": ACTIONS},
+        "reasoning": {"type": "string"},
+        "expected_outcome": {"type": "string"},
+        "risk_level": {"type": "string", "enum": ["low", "medium", "high"]},
+        "reward_estimate": {"type": "integer"},
+    },
+    "required": ["chosen_action", "reasoning", "expected_outcome", "risk_level",
+                 "reward_estimate"],
+}
 
-app = FastAPI()
 
 class CharacterState(BaseModel):
     name: str
@@ -18,10 +77,9 @@ class CharacterState(BaseModel):
     risk_aversion: int
     goals: list
 
-@app.post("/decide")
-def get_decision(state: CharacterState):
-    # Build the prompt
-    prompt = f"""
+
+def build_prompt(state: CharacterState) -> str:
+    return f"""
     You are simulating a fantasy character making decisions.
     State:
     - Name: {state.name}
@@ -46,18 +104,219 @@ def get_decision(state: CharacterState):
     }}
     """
 
-    # Run Ollama locally
-    result = subprocess.run(
-        ["ollama", "run", "gemma:2b", "--json"],
-        input=prompt.encode("utf-8"),
-        capture_output=True
-    )
 
-    # Ollama streams JSON lines → take last line
-    output_lines = result.stdout.decode().strip().split("\n")
-    last_line = output_lines[-1]
+def parse_decision(content: str) -> Dict[str, Any]:
+    try:
+        return json.loads(content)  # return parsed decision
+    except Exception as e:
+        return {"error": str(e), "raw_output": content}
+
+
+# ============================================================
+# MICRO-BATCHING
+# ============================================================
+class LLMTimeout(Exception):
+    """The backend call itself took longer than TIMEOUT."""
+
+
+class MicroBatcher:
+    """Groups prompts that arrive within `window` seconds (up to `max_batch`).
+
+    Each group is dispatched at once, one LLM call per distinct prompt;
+    callers waiting on the same prompt share its result. A call whose
+    callers have all gone (cancelled or timed out) is skipped before it
+    starts and cancelled while it runs.
+    """
+
+    def __init__(self, backend: LLMBackend, window: float = BATCH_WINDOW,
+                 max_batch: int = MAX_BATCH, max_concurrency: int = MAX_CONCURRENCY,
+                 timeout: float = TIMEOUT):
+        self.backend = backend
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.queue: "asyncio.Queue[Tuple[str, asyncio.Future]]" = asyncio.Queue()
+        self.stats = {"requests": 0, "batches": 0, "llm_calls": 0, "coalesced": 0,
+                      "timeouts": 0, "errors": 0, "skipped": 0, "cancelled": 0}
+        self._task: Optional[asyncio.Task] = None
+        self._calls = set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        for task in list(self._calls):
+            task.cancel()
+
+    async def submit(self, prompt: str) -> Dict[str, Any]:
+        self.stats["requests"] += 1
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((prompt, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            waiting: Dict[str, List[asyncio.Future]] = defaultdict(list)
+            for prompt, future in batch:
+                if not future.done():  # the caller may have given up while queued
+                    waiting[prompt].append(future)
+            self.stats["batches"] += 1
+            self.stats["coalesced"] += sum(len(futures) - 1 for futures in waiting.values())
+            for prompt, futures in waiting.items():
+                task = asyncio.create_task(self._dispatch(prompt, futures))
+                self._calls.add(task)
+                task.add_done_callback(self._calls.discard)
+                for future in futures:
+                    future.add_done_callback(lambda _, task=task, futures=futures:
+                                             _abandon(task, futures))
+
+    async def _dispatch(self, prompt: str, futures: List[asyncio.Future]):
+        try:
+            result = await self._call(prompt, futures)
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            raise
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future in futures:
+            if not future.done():  # the caller may have timed out
+                future.set_result(result)
+
+    async def _call(self, prompt: str, futures: List[asyncio.Future]) -> Optional[Dict[str, Any]]:
+        async with self.semaphore:
+            if all(future.done() for future in futures):
+                self.stats["skipped"] += 1
+                return None
+            self.stats["llm_calls"] += 1
+            try:
+                response = await asyncio.wait_for(
+                    self.backend.chat_async(
+                        model=MODEL,
+                        messages=[{"role": "user", "content": prompt}],
+                        format=DECISION_SCHEMA,
+                        keep_alive="30m",
+                    ),
+                    self.timeout,
+                )
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                raise LLMTimeout(f"no reply within {self.timeout}s") from None
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+        return parse_decision(response["message"]["content"])
+
+
+def _abandon(task: asyncio.Task, futures: List[asyncio.Future]):
+    """Cancel a dispatch once nobody is waiting for its result."""
+    if not task.done() and all(future.done() for future in futures):
+        task.cancel()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    options = {"host": HOST} if BACKEND in ("ollama", "http") else {}
+    app.state.batcher = MicroBatcher(make_backend(BACKEND, **options))
+    app.state.batcher.start()
+    yield
+    await app.state.batcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def decide(state: CharacterState,
+                 queue_timeout: Optional[float] = QUEUE_TIMEOUT) -> Dict[str, Any]:
+    """One decision, through the micro-batcher.
+
+    The LLM call itself is bounded by TIMEOUT (504); the whole wait,
+    queueing included, by `queue_timeout` (503; None = no limit).
+    Cancelling this coroutine withdraws the request from the batcher.
+    """
     try:
-        parsed = json.loads(last_line)["response"]
-        return json.loads(parsed)  # return parsed decision
+        return await asyncio.wait_for(app.state.batcher.submit(build_prompt(state)),
+                                      queue_timeout)
+    except LLMTimeout:
+        raise HTTPException(status_code=504, detail="LLM did not answer in time")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Too long in the queue; try again later")
     except Exception as e:
-        return {"error": str(e), "raw_output": last_line}
+        raise HTTPException(status_code=502, detail=f"LLM error: {e}")
+
+
+async def decide_or_error(state: CharacterState) -> Dict[str, Any]:
+    """Like decide(), but a failure becomes that item's result instead of failing the request.
+
+    Items of a batch or stream have no queue deadline: they wait their turn
+    behind the rest of the request, and each LLM call is still bounded by
+    TIMEOUT once it starts.
+    """
+    try:
+        return await decide(state, queue_timeout=None)
+    except HTTPException as e:
+        return {"error": e.detail, "status": e.status_code}
+
+
+def _check_size(states: List[CharacterState]):
+    if len(states) > MAX_STATES:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {MAX_STATES} states per request, got {len(states)}")
+
+
+@app.post("/decide")
+async def get_decision(state: CharacterState):
+    return await decide(state)
+
+
+@app.post("/decide/batch")
+async def get_decisions(states: List[CharacterState]):
+    """All decisions at once, in request order. Concurrency is bounded by the batcher."""
+    _check_size(states)
+    return await asyncio.gather(*(decide_or_error(state) for state in states))
+
+
+@app.post("/decide/stream")
+async def stream_decisions(states: List[CharacterState]):
+    """NDJSON: one line per decision, in completion order, so fast ones are not held back."""
+    _check_size(states)
+
+    async def decide_indexed(index: int, state: CharacterState):
+        return index, await decide_or_error(state)
+
+    async def lines():
+        tasks = [asyncio.create_task(decide_indexed(i, state)) for i, state in enumerate(states)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, decision = await next_done
+                yield json.dumps({"index": index, "name": states[index].name,
+                                  "decision": decision}) + "\n"
+        finally:
+            # Client went away: cancelling the tasks withdraws their queued
+            # prompts and cancels LLM calls that no one else is waiting for.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/stats")
+async def get_stats():
+    return app.state.batcher.stats
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+
+from config import ACTION_OUTCOMES, SECONDARY_OUTCOMES
+from effects import EFFECTS, NO_EFFECT, compile_effects, effect_for, parse_effect
+from npc import NPC
+
+OUTCOMES = sorted({outcome for table in (ACTION_OUTCOMES, SECONDARY_OUTCOMES)
+                   for spec in table.values() for outcome in spec["outcomes"]})
+
+STATES = [(100.0, 20.0, 50.0), (5.0, 3.0, 2.0), (95.0, 140.0, 97.0), (50.0, 0.0, 100.0)]
+
+
+def legacy_adjust_state(npc, effect: str):
+    """NPC.adjust_state before effects.py: the substring cascade, first match wins per stat."""
+    for delta in (5, 10, 15, 20, -5, -10, -15, -20):
+        if f"{delta:+d} mood" in effect:
+            npc.mood = max(0, min(100, npc.mood + delta))
+            break
+
+    for delta in (10, 15, 20, 25, -10, -15, -20, -25, -30, -35):
+        if f"{delta:+d} health" in effect:
+            npc.health = max(0, min(100, npc.health + delta))
+            break
+    else:
+        if "Lose 0.2 health" in effect:
+            npc.health = max(0, npc.health - 20)
+
+    for delta in (10, 12, 15, 20, 25, 30, 35, 40, 50, 80):
+        if f"+{delta} money" in effect:
+            npc.money += delta
+            break
+    else:
+        for delta in (10, 15, 20, 25, 30):
+            if f"-{delta} money" in effect:
+                npc.money = max(0, npc.money - delta)
+                break
+        else:
+            if "Lose 0.5 money" in effect:
+                npc.money = max(0, npc.money * 0.5)
+            else:
+                for spend in (5, 10, 15, 20):
+                    if f"spend {spend} money" in effect:
+                        npc.money = max(0, npc.money - spend)
+                        break
+
+    if "Die" in effect:
+        npc.health = 0
+
+
+def _stats(health, money, mood):
+    return SimpleNamespace(health=health, money=money, mood=mood)
+
+
+@pytest.mark.parametrize("outcome", OUTCOMES)
+@pytest.mark.parametrize("health,money,mood", STATES)
+def test_compiled_effect_matches_legacy_adjust_state(outcome, health, money, mood):
+    expected = _stats(health, money, mood)
+    legacy_adjust_state(expected, outcome)
+    actual = _stats(health, money, mood)
+    NPC.apply_effect(actual, effect_for(outcome))
+    assert vars(actual) == pytest.approx(vars(expected))
+
+
+def test_every_configured_outcome_is_compiled():
+    assert set(OUTCOMES) <= set(EFFECTS)
+
+
+@pytest.mark.parametrize("text", [
+    "You find gold (+1O money)",
+    "You find gold (+10 gold)",
+    "You trip (- 10 health)",
+    "You are robbed (lose 0.5 money)",
+    "You spend 5 coins (spend 5 coins)",
+])
+def test_malformed_outcome_is_rejected(text):
+    with pytest.raises(ValueError):
+        parse_effect(text, strict=True)
+    table = {"Act": {"outcomes": [text], "probs": [1.0]}}
+    with pytest.raises(ValueError, match="Invalid outcome tables"):
+        compile_effects(table)
+
+
+def test_mismatched_probs_are_rejected():
+    table = {"Act": {"outcomes": ["Nothing happens"], "probs": [0.5, 0.5]}}
+    with pytest.raises(ValueError, match="differ in length"):
+        compile_effects(table)
+
+
+def test_text_without_numbers_has_no_effect():
+    assert parse_effect("Nothing happens", strict=True) == NO_EFFECT
+    assert effect_for("Something not in the tables") == NO_EFFECT
@@ -0,0 +1,16 @@
+import pytest
+
+from llm_backends import BACKENDS, LLMBackend, make_backend
+
+
+def test_backend_without_chat_fails_at_construction():
+    class Incomplete(LLMBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize("name", sorted(BACKENDS))
+def test_registered_backends_are_complete(name):
+    assert isinstance(make_backend(name), LLMBackend)
@@ -0,0 +1,32 @@
+import pytest
+
+from mdp import ACTIONS, QUEST, QUEST_MIN_HEALTH, QUEST_MIN_MOOD, score_decisions, solve
+
+OFF_GRID = [(100, 20, 52), (62, 20, 80), (61.5, 33.3, 50.5), (87, 140, 97), (45, 12, 63),
+            (70, 0.5, 49), (99.9, 75, 51)]
+
+
+@pytest.fixture(scope="module")
+def solution():
+    return solve(10)
+
+
+@pytest.mark.parametrize("health,money,mood", OFF_GRID)
+def test_quest_offered_from_real_state(solution, health, money, mood):
+    q = solution.action_values(health, money, mood, 10)
+    assert (ACTIONS[QUEST] in q) == (mood > QUEST_MIN_MOOD and health > QUEST_MIN_HEALTH)
+
+
+@pytest.mark.parametrize("health,money,mood", OFF_GRID)
+def test_best_action_has_zero_regret(solution, health, money, mood):
+    best = solution.best_action(health, money, mood, 10)
+    log = [{"day": 1, "action": best, "state_before": {"health": health, "money": money, "mood": mood}}]
+    scored = score_decisions(log, solution, days=10)
+    assert scored["decisions"][0]["best_action"] == best
+    assert scored["decisions"][0]["regret"] == 0.0
+
+
+def test_regret_compares_actions_at_one_cell(solution):
+    q = solution.action_values(100, 20, 52, 10)
+    at_cell = solution.action_values(100, 20, 55, 10)
+    assert q == at_cell
@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+
+from memory import CharacterMemory
+
+
+def _days(n):
+    """(action, outcome) pairs, mixing config outcomes with free text."""
+    outcomes = ["You make a new friend (+10 mood)", "You pass out and wake up robbed (-15 money)",
+                "Nothing happens"]
+    return [("Get Drunk" if day % 2 else "Chat with Keeper", f"{outcomes[day % 3]} on day {day}"
+             if day % 4 == 0 else outcomes[day % 3]) for day in range(n)]
+
+
+def _play(memory, days, flush=True):
+    for day, (action, outcome) in enumerate(days):
+        memory.remember(action, outcome)
+        if memory.summaries.pending() is not None:
+            memory.fold(f"Summary written on day {day}.")
+        if day % 7 == 6:
+            memory.goals = memory.goals + [f"goal {day}"]
+            memory.mark_dirty()
+        if flush:
+            memory.flush()
+
+
+def _open(tmp_path, **kwargs):
+    return CharacterMemory("Aldric", str(tmp_path / "aldric_state.json"), event_log=True, **kwargs)
+
+
+def _log_events(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_replay_matches_to_dict(tmp_path):
+    memory = _open(tmp_path)
+    _play(memory, _days(30))
+    assert not os.path.exists(memory.file_path)  # everything is still in the log
+
+    assert _open(tmp_path).to_dict() == memory.to_dict()
+
+
+def test_torn_last_line_is_discarded(tmp_path):
+    memory = _open(tmp_path)
+    days = _days(11)
+    _play(memory, days)
+    with open(memory.log_path, "rb") as f:
+        data = f.read()
+    last_line = data.rstrip(b"\n").rsplit(b"\n", 1)[1]
+    assert json.loads(last_line)["op"] == "remember"
+    with open(memory.log_path, "wb") as f:
+        f.write(data[:-len(last_line) // 2])  # crash half way through the last append
+
+    reference = CharacterMemory("Ref", str(tmp_path / "ref_state.json"), event_log=False)
+    _play(reference, days[:-1], flush=False)
+    replayed = _open(tmp_path)
+    expected = reference.to_dict()
+    expected["seq"] = memory.seq - 1
+    assert replayed.to_dict() == expected
+
+    # The torn tail is cut off, so later appends start on a clean line
+    replayed.remember(*days[-1])
+    replayed.flush()
+    assert [event["seq"] for event in _log_events(replayed.log_path)][-1] == memory.seq
+    assert _open(tmp_path).to_dict() == replayed.to_dict()
+
+
+def test_seq_numbers_increase_and_are_not_replayed_twice(tmp_path):
+    memory = _open(tmp_path)
+    _play(memory, _days(10))
+    seqs = [event["seq"] for event in _log_events(memory.log_path)]
+    assert seqs == list(range(1, len(seqs) + 1))
+
+    # Crash after the snapshot was written but before the rotated log was removed
+    shutil.copy(memory.log_path, str(tmp_path / "kept.log"))
+    memory.compact(background=False)
+    os.replace(str(tmp_path / "kept.log"), f"{memory.log_path}.compacting")
+
+    replayed = _open(tmp_path)
+    assert replayed.to_dict() == memory.to_dict()
+    assert len(replayed.episodes) == len(memory.episodes)
+
+
+def test_compaction_folds_log_into_snapshot(tmp_path):
+    memory = _open(tmp_path, compact_bytes=2_000)
+    days = _days(80)
+    _play(memory, days[:60])
+    memory.wait_for_compaction()
+    with open(memory.file_path) as f:
+        snapshot_seq = json.load(f)["seq"]
+    assert 0 < snapshot_seq <= memory.seq
+    assert not os.path.exists(f"{memory.log_path}.compacting")
+    if os.path.exists(memory.log_path):
+        assert os.path.getsize(memory.log_path) <= 2_000
+        assert all(event["seq"] > snapshot_seq for event in _log_events(memory.log_path))
+
+    _play(memory, days[60:])
+    memory.wait_for_compaction()
+    assert _open(tmp_path, compact_bytes=2_000).to_dict() == memory.to_dict()